@@ -1,11 +1,11 @@
 # pylint: disable=missing-class-docstring,missing-function-docstring
 
 from collections import OrderedDict
+import hashlib
 import os
 import traceback
 from mysql.connector import IntegrityError
 from typing import Sequence
-from urllib.request import urlopen
 import discord
 import discord.ext
 from discord.ext import tasks
@@ -13,20 +13,38 @@ from discord.ui import Button, View, Modal, InputText
 from discord import File
 import orjson
 import sqlalchemy
-import requests
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import inspect, func, desc
+from sqlalchemy import inspect, desc
 from sqlalchemy.exc import OperationalError
+import util.announcements
+import util.events
+import util.exports
+import util.fetch
+import util.images
 import util.invites
+import util.outbox
+import util.purge
+import util.rosters
+import util.scheduler
+import util.templates
+from util.fetch import FetchError
 from util.log import Log
-from util.db import DbGuild, DbInvite, DbUser, DbCategory, DbVerifyingUser, DbEvent, DbSubscriber, Base
+from util.db import DbGuild, DbInvite, DbUser, DbCategory, DbVerifyingUser, DbEvent, DbSubscriber, DbProvisionJob, DbProvisionItem, DbOutboxMessage, DbBotMessage, DbScheduledJob, Base
 from util.emojis import sync_add, sync_delete, sync_name
 import datetime
 from io import BytesIO
 import asyncio
 
 
-bot = discord.Bot(intents=discord.Intents.all())
+class PittBot(discord.Bot):
+    """The bot, which also closes the shared HTTP client when it shuts down."""
+
+    async def close(self):
+        await super().close()
+        await util.fetch.close()
+
+
+bot = PittBot(intents=discord.Intents.all())
 
 # ------------------------------- INITIALIZATION -------------------------------
 
@@ -43,6 +61,8 @@ DATABASE_PASSWORD = os.getenv("MYSQL_PASSWORD")
 DATABASE_IP = os.getenv("MYSQL_IP")
 DATABASE_PORT = os.getenv("MYSQL_PORT")
 DATABASE_NAME = os.getenv("MYSQL_DATABASE")
+# Optional full SQLAlchemy URL, overrides the MySQL settings above (used by the load test harness).
+DATABASE_URL = os.getenv("PITTBOT_DATABASE_URL")
 # Discord channel IDs - must be set for bot to work properly.
 HUB_SERVER_ID = int(os.getenv("HUB_SERVER_ID"))
 BOT_COMMANDS_ID = int(os.getenv("BOT_COMMANDS_ID"))
@@ -51,6 +71,23 @@ Log.ok("Environment variables loaded.")
 # Settings - not currently used/important
 LONG_DELETE_TIME = 60.0
 SHORT_DELETE_TIME = 15.0
+# Seconds between edits of a live progress embed
+PROGRESS_UPDATE_INTERVAL = 3.0
+# Emails looked up per database query by /assign
+ASSIGN_QUERY_CHUNK = 500
+# Role additions in flight at once during /assign
+ASSIGN_CONCURRENCY = 5
+# Residence hall servers an event is cloned into at once
+EVENT_CLONE_CONCURRENCY = 5
+# Minutes between checks that event clones still match the hub
+EVENT_RECONCILE_MINUTES = 30
+# How long before an event starts residents are reminded of it
+EVENT_REMINDER_LEAD = datetime.timedelta(minutes=30)
+# Weekly event announcements go out on this weekday (Monday is 0) at this hour, in UTC
+WEEKLY_ANNOUNCEMENT_WEEKDAY = 0
+WEEKLY_ANNOUNCEMENT_HOUR = 13
+# Seconds a member join waits for its guild to warm up before carrying on with whatever is cached
+JOIN_READY_TIMEOUT = 30
 # Messaging
 VERIFICATION_MESSAGE = "Welcome! Please click the verify button below to confirm that you are a resident."
 # Database Execution
@@ -82,7 +119,8 @@ with open("config.json", "r") as config:
 # Database initialization
 Log.info("Attempting database connection...")
 db = sqlalchemy.create_engine(
-    f"mysql+mysqlconnector://{DATABASE_USER}:{DATABASE_PASSWORD}@{DATABASE_IP}:{DATABASE_PORT}/{DATABASE_NAME}",
+    DATABASE_URL
+    or f"mysql+mysqlconnector://{DATABASE_USER}:{DATABASE_PASSWORD}@{DATABASE_IP}:{DATABASE_PORT}/{DATABASE_NAME}",
     echo=False
 )
 # Database session init
@@ -92,7 +130,7 @@ session = Session()
 inspector = inspect(db)
 existing_tables = inspector.get_table_names()
 # Define all your tables
-tables = [DbUser, DbGuild, DbInvite, DbCategory, DbVerifyingUser, DbEvent, DbSubscriber]
+tables = [DbUser, DbGuild, DbInvite, DbCategory, DbVerifyingUser, DbEvent, DbSubscriber, DbProvisionJob, DbProvisionItem, DbOutboxMessage, DbBotMessage, DbScheduledJob]
 # Check if each table exists, and log a message if it doesn't
 for table in tables:
     if table.__tablename__ not in existing_tables:
@@ -100,6 +138,17 @@ for table in tables:
 
 # Create tables
 Base.metadata.create_all(db)
+# Databases made before the normalized email column need it added and backfilled
+if "users" in existing_tables and "email_key" not in {
+    column["name"] for column in inspector.get_columns("users")
+}:
+    Log.info("Adding normalized email column to table: users")
+    with db.begin() as connection:
+        connection.execute(sqlalchemy.text("ALTER TABLE users ADD COLUMN email_key VARCHAR(30)"))
+        connection.execute(sqlalchemy.text("UPDATE users SET email_key = LOWER(email)"))
+    for index in DbUser.__table__.indexes:
+        if "email_key" in index.columns:
+            index.create(db)
 Log.ok("Database is ready.")
 
 # ------------------------------- GLOBAL VARIABLES  -------------------------------
@@ -144,6 +193,44 @@ user_to_assigned_role = {}
 # Cache of emojis that were modified/deleted during a current synchronization
 synced_emoji_cache = set()
 
+# Guild ID to the event used to cancel a make_categories run in progress there
+provisioning_cancel_events = {}
+
+# Event name to the number of its latest, not cancelled, database record
+event_name_to_number = {}
+
+# Cache of user IDs to their email address (None if they have no record), so event
+# subscriptions don't need a database read
+user_to_email = {}
+
+# Hub scheduled event ID to {guild ID: clone event ID} for its clone in each residence hall server.
+# Hub events only get an entry once they have been published to the residence hall servers.
+hub_event_to_clones = {}
+
+# Guild ID to an event set once the guild's caches are warmed up after startup
+guild_ready = {}
+
+# Guild ID to the IDs of members who have not been verified (have no roles besides @everyone),
+# kept up to date by the member event handlers
+guild_to_unverified = {}
+
+
+async def report_dm_failure(message, ex):
+    """Warn a guild's logs channel when a direct message about it could not be delivered."""
+    guild = bot.get_guild(message.guild_id) if message.guild_id else None
+    logs_channel = discord.utils.get(guild.channels, name="logs") if guild else None
+    if logs_channel:
+        await logs_channel.send(
+            f"**WARNING**: User [{message.user_id}] does not allow DMs or creating a DM failed, could not send them '{message.dedup_key}' message."
+        )
+
+
+# Persistent, deduplicated queue of direct messages to members
+dm_outbox = util.outbox.DmOutbox(bot, session, on_failure=report_dm_failure)
+
+# Runs weekly announcements, event reminders and delayed broadcasts at their time
+scheduler = util.scheduler.Scheduler(session)
+
 # ------------------------------- CLASSES -------------------------------
 
 
@@ -532,6 +619,7 @@ class URLModal(Modal):
         self.stop()
 
 
+# Persistent: registered with bot.add_view at startup, so buttons posted before a restart keep working
 class VerifyView(View):
     def __init__(self):
         super().__init__(timeout=None)
@@ -539,11 +627,967 @@ class VerifyView(View):
         help_button = discord.ui.Button(label="Get Help", style=discord.ButtonStyle.link, url="https://pitt.co1.qualtrics.com/jfe/form/SV_25Y15jZ9BmYYEf4")
         self.add_item(help_button)
 
-    @discord.ui.button(label="Verify", style=discord.ButtonStyle.green)
+    @discord.ui.button(label="Verify", style=discord.ButtonStyle.green, custom_id="pittbot:verify")
     async def verify_callback(self, button, interaction):
         await verify(interaction)
 
 
+# ------------------------------- HELPERS -------------------------------
+
+
+def load_provision_job(guild_id: int, ras: list[str]):
+    """Find the unfinished provisioning job for this roster in this guild, or start a new one.
+
+    Args:
+        guild_id (int): Guild the communities are being made in.
+        ras (list[str]): The RA roster.
+
+    Returns:
+        DbProvisionJob: The job, with one item per RA, marked as running.
+    """
+    roster_hash = hashlib.sha256("\n".join(ras).encode()).hexdigest()
+
+    job = (
+        session.query(DbProvisionJob)
+        .filter(
+            DbProvisionJob.guild_id == guild_id,
+            DbProvisionJob.roster_hash == roster_hash,
+            DbProvisionJob.status != "completed",
+        )
+        .order_by(desc(DbProvisionJob.created_at))
+        .first()
+    )
+
+    if job:
+        Log.info(f"Resuming provisioning job {job.ID} for guild {guild_id}")
+    else:
+        job = DbProvisionJob(guild_id=guild_id, roster_hash=roster_hash, total=len(ras))
+        job.items = [
+            DbProvisionItem(position=position, ra_line=ra_line.strip()[:100])
+            for position, ra_line in enumerate(ras)
+        ]
+        session.add(job)
+
+    job.status = "running"
+    try:
+        session.commit()
+    except Exception as ex:
+        session.rollback()
+        Log.error(f"An error occurred: {ex}\n{traceback.format_exc()}")
+
+    return job
+
+
+def get_event_number(event_name: str):
+    """Get the number of an event's database record, reading the database only on a cache miss.
+
+    Args:
+        event_name (str): Name of the event.
+
+    Returns:
+        int: The event number, or None if the event has no record.
+    """
+    if event_name not in event_name_to_number:
+        row = (
+            session.query(DbEvent.event_number)
+            .filter(DbEvent.status != 'cancelled', DbEvent.event_name == event_name)
+            .order_by(desc(DbEvent.created_at))
+            .first()
+        )
+        if row is None:
+            return None
+        event_name_to_number[event_name] = row.event_number
+    return event_name_to_number[event_name]
+
+
+def get_user_email(user_id: int):
+    """Get a user's email address, reading the database only on a cache miss.
+
+    Args:
+        user_id (int): The user's discord ID.
+
+    Returns:
+        str: The email address, or None if the user has no record.
+    """
+    if user_id not in user_to_email:
+        row = session.query(DbUser.email).filter_by(ID=user_id).first()
+        user_to_email[user_id] = row.email if row else None
+    return user_to_email[user_id]
+
+
+@sqlalchemy.event.listens_for(DbUser, "after_insert")
+@sqlalchemy.event.listens_for(DbUser, "after_update")
+@sqlalchemy.event.listens_for(DbUser, "after_delete")
+def forget_user_email(mapper, connection, target):
+    # Any change to a user's record may change their email
+    user_to_email.pop(target.ID, None)
+
+
+def is_unverified(member: discord.Member):
+    """Whether a member has yet to be verified, i.e. has no roles besides @everyone."""
+    return len(member.roles) <= 1
+
+
+def index_unverified(guild: discord.Guild):
+    """Rebuild a guild's unverified member index from its member cache.
+
+    Args:
+        guild (discord.Guild): The guild to index.
+    """
+    guild_to_unverified[guild.id] = {
+        member.id for member in guild.members if is_unverified(member)
+    }
+
+
+def track_unverified(member: discord.Member):
+    """Add or remove a member from their guild's unverified index to match their current roles.
+
+    Args:
+        member (discord.Member): A member who joined or whose roles changed.
+    """
+    unverified = guild_to_unverified.setdefault(member.guild.id, set())
+    if is_unverified(member):
+        unverified.add(member.id)
+    else:
+        unverified.discard(member.id)
+
+
+def get_unverified(guild: discord.Guild):
+    """Get the members of a guild who have yet to be verified, without crawling the member list.
+
+    Args:
+        guild (discord.Guild): The guild to look in.
+
+    Returns:
+        list[discord.Member]: Unverified members, ordered by when they joined.
+    """
+    if guild.id not in guild_to_unverified:
+        index_unverified(guild)
+
+    members = []
+    for member_id in list(guild_to_unverified[guild.id]):
+        member = guild.get_member(member_id)
+        # Drop anyone who left or was verified while the index wasn't watching
+        if not member or not is_unverified(member):
+            guild_to_unverified[guild.id].discard(member_id)
+            continue
+        members.append(member)
+
+    members.sort(key=lambda member: member.joined_at or discord.utils.utcnow())
+    return members
+
+
+def refresh_unverified(member: discord.Member):
+    """Look a member up again, for commands that act on them a while after listing them.
+
+    Args:
+        member (discord.Member): A member returned by `get_unverified` earlier.
+
+    Returns:
+        discord.Member: The member as they are now, or None if they left or have been verified since.
+    """
+    current = member.guild.get_member(member.id)
+    if not current or not is_unverified(current):
+        return None
+    return current
+
+
+async def send_report(ctx, header: str, lines: list[str], filename: str, ephemeral: bool = False):
+    """Send a header and a list of lines as a followup, attaching the lines as a
+    text file instead if they would not fit in a single message.
+
+    Args:
+        ctx (discord.ApplicationContext): Deferred context to follow up on.
+        header (str): Summary shown in the message itself.
+        lines (list[str]): Lines of the report.
+        filename (str): Name of the attachment, if one is needed.
+        ephemeral (bool, optional): Only show the report to the user who ran the command.
+    """
+    body = "\n".join(lines)
+    if len(header) + len(body) + 8 <= 2000:
+        content = f"{header}\n```{body}```" if body else header
+        await ctx.send_followup(content=content, ephemeral=ephemeral)
+    else:
+        await ctx.send_followup(
+            content=header,
+            file=discord.File(BytesIO(body.encode()), filename=filename),
+            ephemeral=ephemeral,
+        )
+
+
+async def show_progress(message, work, make_embed):
+    """Run a coroutine, editing a message with a fresh progress embed at intervals until it finishes.
+
+    Args:
+        message (discord.WebhookMessage): Followup message holding the progress embed.
+        work (coroutine): The long-running work.
+        make_embed (function): Builds the progress embed from the current state of the work.
+
+    Returns:
+        Whatever the work returned.
+    """
+    work = asyncio.ensure_future(work)
+    while not work.done():
+        await asyncio.wait([work], timeout=PROGRESS_UPDATE_INTERVAL)
+        try:
+            await message.edit(embed=make_embed())
+        except discord.HTTPException:
+            pass
+    return work.result()
+
+
+async def send_export(ctx, export, filename: str, *args):
+    """Run an export from util.exports and send the result as a followup attachment."""
+    await ctx.defer(ephemeral=True)
+
+    started = datetime.datetime.now()
+    try:
+        output, count = await util.exports.run_export(export, Session, *args)
+    except Exception as ex:
+        Log.error(f"An error occurred: {ex}\n{traceback.format_exc()}")
+        await ctx.send_followup("The export failed, check the logs for details.", ephemeral=True)
+        return
+
+    with output:
+        size = output.seek(0, os.SEEK_END)
+        output.seek(0)
+        elapsed = (datetime.datetime.now() - started).total_seconds()
+        Log.ok(f"Exported {count} rows to {filename} ({size} bytes) in {elapsed:.1f}s")
+        if size > ctx.guild.filesize_limit:
+            await ctx.send_followup(
+                f"The export of {count} rows is {size // 1024} KB, too large to upload to this server.",
+                ephemeral=True,
+            )
+            return
+        await ctx.send_followup(
+            f"Exported {count} rows.",
+            file=discord.File(output, filename=filename),
+            ephemeral=True,
+        )
+
+
+def member_progress_embed(title: str, colour: discord.Colour, progress: dict):
+    """Progress embed for prune_pending and assist_verification."""
+    embed = discord.Embed(title=title, color=colour)
+    for field, value in progress.items():
+        if field != "total":
+            embed.add_field(name=field.capitalize(), value=f"{value}/{progress['total']}")
+    return embed
+
+
+def release_provisioning(guild_id: int, cancel_event: asyncio.Event):
+    """Let other make_categories runs into a guild again, unless a different run has claimed it since."""
+    if provisioning_cancel_events.get(guild_id) is cancel_event:
+        del provisioning_cancel_events[guild_id]
+
+
+async def provision_communities(
+    guild: discord.Guild, ras: list[str], on_ra_done=None, cancel_event: asyncio.Event = None
+):
+    """Create (or resume creating) the RA communities for a roster, then cache and
+    persist the new category and invite associations.
+
+    The caller must check `provisioning_cancel_events` first; a guild can only run one job at a time.
+    Callers that await anything between that check and this call should claim the guild themselves
+    by putting `cancel_event` in `provisioning_cancel_events` before their first await.
+
+    Args:
+        guild (discord.Guild): The guild to make the communities in.
+        ras (list[str]): The RA roster.
+        on_ra_done (callable, optional): Called as `on_ra_done(completed, total)` when the job is
+            loaded and again whenever an RA is finished.
+        cancel_event (asyncio.Event, optional): The event the caller already claimed the guild with.
+            The guild is claimed here if not given.
+
+    Returns:
+        tuple: (DbProvisionJob, result of util.invites.make_categories, seconds taken)
+    """
+    # Necessary because of Python's dynamic name binding and the way '|=' works
+    global category_to_role
+
+    # Resume an unfinished run of the same roster, or start a new one
+    job = load_provision_job(guild.id, ras)
+    checkpoints = {item.position: item for item in job.items}
+    completed_count = sum(1 for item in job.items if item.completed)
+    if on_ra_done:
+        on_ra_done(completed_count, job.total)
+
+    def on_progress(position, invite_code, role_id, category_id, completed):
+        nonlocal completed_count
+        item = checkpoints[position]
+        item.invite_code = invite_code
+        item.role_id = role_id
+        item.category_id = category_id
+        item.completed = completed
+        try:
+            session.commit()
+        except Exception as ex:
+            session.rollback()
+            Log.error(f"Couldn't checkpoint RA {position} of provisioning job {job.ID}: {ex}")
+        if completed:
+            completed_count += 1
+            if on_ra_done:
+                on_ra_done(completed_count, job.total)
+
+    if cancel_event is None:
+        cancel_event = asyncio.Event()
+        provisioning_cancel_events[guild.id] = cancel_event
+
+    # Make the categories. This also makes their channels, the roles, and the list of RAs
+    # with the associated invite links.
+    provisioning_started = datetime.datetime.now()
+    try:
+        result = await util.invites.make_categories(
+            guild,
+            ras,
+            guild_to_landing.get(guild.id),
+            checkpoints=checkpoints,
+            on_progress=on_progress,
+            cancel_event=cancel_event,
+        )
+    finally:
+        release_provisioning(guild.id, cancel_event)
+    provisioning_time = (datetime.datetime.now() - provisioning_started).total_seconds()
+
+    num_completed = sum(1 for item in job.items if item.completed)
+    if cancel_event.is_set():
+        job.status = "cancelled"
+    elif num_completed == job.total:
+        job.status = "completed"
+    else:
+        job.status = "failed"
+    try:
+        session.commit()
+    except Exception as ex:
+        session.rollback()
+        Log.error(f"An error occurred: {ex}\n{traceback.format_exc()}")
+
+    if not result or not result[1]:
+        return (job, result, provisioning_time)
+
+    invite_role_dict, category_role_dict, _ = result
+
+    # Update category to role cache with newly generated categories
+    category_to_role |= category_role_dict
+
+    # Serialize new items added to category_to_role here
+    for category_id, role_id in category_role_dict.items():
+        category_obj = DbCategory(ID=category_id, role_id=role_id)
+
+        try:
+            session.merge(category_obj)
+        except Exception:
+            Log.error(f"Couldn't merge {{{category_id}:{role_id}}} to database.")
+    try:
+        session.commit()
+    except Exception:
+        session.rollback()
+        Log.error(f"Couldn't merge any categories into to database.")
+
+    # Update invite cache, important for on_member_join's functionality
+    invites_cache[guild.id] = await guild.invites()
+
+    # Iterate over the invites, adding the new role object
+    # to our global dict if it was just created.
+    for invite in invites_cache[guild.id]:
+        if invite.code in invite_role_dict:
+            invite_obj = DbInvite(
+                code=invite.code,
+                guild_id=guild.id,
+                role_id=invite_role_dict[invite.code].id,
+            )
+            session.merge(invite_obj)
+            invite_to_role[invite.code] = invite_role_dict[invite.code]
+    try:
+        session.commit()
+    except Exception as ex:
+        session.rollback()
+        Log.error(f"An error occurred: {ex}\n{traceback.format_exc()}")
+
+    return (job, result, provisioning_time)
+
+
+def event_location(scheduled_event: discord.ScheduledEvent):
+    """Where an event takes place, in the form create_scheduled_event and edit accept."""
+    if scheduled_event.location.type.name != 'external':
+        return str(scheduled_event.location.type.name)
+    return scheduled_event.location.value
+
+
+def clone_sync_operation(hub_event: discord.ScheduledEvent, clone: discord.ScheduledEvent):
+    """Work out the single call that brings a clone in line with its hub event.
+
+    Args:
+        hub_event (discord.ScheduledEvent): The hub event.
+        clone (discord.ScheduledEvent): Its clone in a residence hall server.
+
+    Returns:
+        tuple: ('edit', 'start' or 'complete', function returning the coroutine to await),
+            or None if the clone is already up to date.
+    """
+    hub_status = hub_event.status.name
+    status = clone.status.name
+    location = event_location(hub_event)
+
+    # Syncs edits to scheduled events
+    if hub_status == "scheduled" and status == "scheduled":
+        if (clone.name, clone.description, event_location(clone), clone.start_time, clone.end_time) == (
+            hub_event.name, hub_event.description, location, hub_event.start_time, hub_event.end_time
+        ):
+            return None
+        return ("edit", lambda: clone.edit(
+            name=hub_event.name,
+            description=hub_event.description,
+            location=location,
+            start_time=hub_event.start_time,
+            end_time=hub_event.end_time,
+        ))
+    # Syncs manual starts and edits to active events
+    if hub_status == "active" and status == "scheduled":
+        return ("start", clone.start)
+    if hub_status == "active" and status == "active":
+        if (clone.name, clone.description, event_location(clone), clone.end_time) == (
+            hub_event.name, hub_event.description, location, hub_event.end_time
+        ):
+            return None
+        return ("edit", lambda: clone.edit(
+            name=hub_event.name,
+            description=hub_event.description,
+            location=location,
+            end_time=hub_event.end_time,
+        ))
+    # Syncs manual completion of active events
+    if hub_status == "completed" and status == "active":
+        return ("complete", clone.complete)
+    return None
+
+
+def index_event_clones():
+    """Rebuild the hub event to clone index by matching event names, for events created before a restart."""
+    hub = bot.get_guild(HUB_SERVER_ID)
+    if not hub:
+        return
+
+    hub_event_to_clones.clear()
+    for guild in bot.guilds:
+        if guild.id == HUB_SERVER_ID:
+            continue
+        events_by_name = {event.name: event for event in guild.scheduled_events}
+        for hub_event in hub.scheduled_events:
+            clone = events_by_name.get(hub_event.name)
+            if clone:
+                hub_event_to_clones.setdefault(hub_event.id, {})[guild.id] = clone.id
+
+
+def get_event_clones(hub_event_id: int):
+    """Look up the clones of a hub event from the gateway cache, without scanning every server's events.
+
+    Args:
+        hub_event_id (int): ID of the hub event.
+
+    Returns:
+        list[tuple]: (guild, clone event) for each residence hall server with a clone.
+    """
+    clones = hub_event_to_clones.get(hub_event_id, {})
+    found = []
+    for guild_id, clone_id in list(clones.items()):
+        guild = bot.get_guild(guild_id)
+        clone = guild.get_scheduled_event(clone_id) if guild else None
+        if not clone:
+            # The clone was deleted or the bot left the server
+            del clones[guild_id]
+            continue
+        found.append((guild, clone))
+    return found
+
+
+async def sync_event_clones(hub_event_id: int, sync):
+    """Apply a change to every clone of a hub event concurrently.
+
+    Args:
+        hub_event_id (int): ID of the hub event.
+        sync (function): Given a clone, returns the coroutine that updates it, or None if it is up to date.
+
+    Returns:
+        tuple: (number of clones changed, list of (guild, exception) for clones that failed)
+    """
+    limiter = asyncio.Semaphore(EVENT_CLONE_CONCURRENCY)
+    failures = []
+
+    async def run(guild: discord.Guild, clone: discord.ScheduledEvent):
+        operation = sync(clone)
+        if operation is None:
+            return False
+        async with limiter:
+            try:
+                await operation
+                return True
+            except Exception as ex:
+                Log.error(f"Syncing event {clone.name} in {guild.name}[{guild.id}] failed: {ex}")
+                failures.append((guild, ex))
+                return False
+
+    results = await asyncio.gather(*(run(guild, clone) for guild, clone in get_event_clones(hub_event_id)))
+    return (results.count(True), failures)
+
+
+async def clone_event(scheduled_event: discord.ScheduledEvent, location: str, cover: bytes = None):
+    """Clone a hub event into every residence hall server at once, then post a summary to #bot-commands.
+
+    Args:
+        scheduled_event (discord.ScheduledEvent): The hub event.
+        location (str): Where the event takes place.
+        cover (bytes, optional): Cover image, set as part of creating each clone.
+
+    Returns:
+        list[tuple]: (guild, clone or None, exception or None) for every residence hall server.
+    """
+    limiter = asyncio.Semaphore(EVENT_CLONE_CONCURRENCY)
+
+    async def clone_into(guild: discord.Guild):
+        async with limiter:
+            try:
+                event_clone = await util.events.create_clone(guild, scheduled_event, location, cover)
+                return (guild, event_clone, None)
+            except Exception as ex:
+                Log.error(f"Cloning event {scheduled_event.name} into {guild.name}[{guild.id}] failed: {ex}")
+                return (guild, None, ex)
+
+    started = datetime.datetime.now()
+    results = await asyncio.gather(
+        *(clone_into(guild) for guild in bot.guilds if guild.id != HUB_SERVER_ID)
+    )
+    elapsed = (datetime.datetime.now() - started).total_seconds()
+
+    hub_event_to_clones[scheduled_event.id] = {
+        guild.id: event_clone.id for guild, event_clone, _ in results if event_clone
+    }
+    schedule_event_reminder(scheduled_event)
+
+    failed = [(guild, ex) for guild, _, ex in results if ex]
+    summary = (
+        f"Event **{scheduled_event.name}** successfully created **{'with' if cover else 'without'}** cover image"
+        f" in {len(results) - len(failed)}/{len(results)} servers ({elapsed:.1f}s)."
+    )
+    Log.ok(summary.replace("**", ""))
+
+    bot_commands = bot.get_channel(BOT_COMMANDS_ID)
+    if failed:
+        lines = [f"{guild.name}[{guild.id}]: {ex}" for guild, ex in failed]
+        body = "\n".join(lines)
+        if len(summary) + len(body) + 30 <= 2000:
+            await bot_commands.send(f"{summary}\n**Failed:**\n```{body}```")
+        else:
+            await bot_commands.send(
+                f"{summary}\n**Failed servers are attached.**",
+                file=discord.File(BytesIO(body.encode()), filename="event-clone-failures.txt"),
+            )
+    else:
+        await bot_commands.send(summary)
+
+    return results
+
+
+def get_guild_ready(guild_id: int):
+    """Get the event that is set once a guild's caches are ready to use."""
+    return guild_ready.setdefault(guild_id, asyncio.Event())
+
+
+async def wait_for_guild(guild_id: int, timeout: float = None):
+    """Wait for a guild to finish warming up after startup.
+
+    Args:
+        guild_id (int): The guild.
+        timeout (float, optional): Give up after this many seconds. Defaults to waiting indefinitely.
+
+    Returns:
+        bool: Whether the guild is ready.
+    """
+    ready = get_guild_ready(guild_id)
+    if ready.is_set():
+        return True
+    try:
+        await asyncio.wait_for(ready.wait(), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+
+
+async def warm_up_guild(guild: discord.Guild, prompted_guilds: set):
+    """Fill a guild's invite, role and landing channel caches after startup, then mark it ready.
+
+    Args:
+        guild (discord.Guild): The guild.
+        prompted_guilds (set[int]): Guilds whose verification prompt is already posted.
+
+    Returns:
+        dict: Seconds spent on each stage, for the startup timing report.
+    """
+    timings = {}
+    started = datetime.datetime.now()
+
+    def lap(stage: str):
+        nonlocal started
+        now = datetime.datetime.now()
+        timings[stage] = (now - started).total_seconds()
+        started = now
+
+    try:
+        # Build a default invite cache
+        try:
+            invites_cache[guild.id] = await guild.invites()
+        except discord.errors.Forbidden:
+            invites_cache[guild.id] = []
+            Log.warning(f"Can't read invites in {guild.name}[{guild.id}], invite tracking is disabled there")
+        lap("invites")
+
+        # One query for every invite in the guild, rather than one per invite
+        codes = [invite.code for invite in invites_cache[guild.id]]
+        if codes:
+            for invite_obj in session.query(DbInvite).filter(DbInvite.code.in_(codes)):
+                invite_to_role[invite_obj.code] = discord.utils.get(guild.roles, id=invite_obj.role_id)
+        lap("database")
+
+        # A little bit of a hack that prevents us from needing a database for guilds yet
+        guild_to_landing[guild.id] = discord.utils.get(guild.channels, name="verify")
+
+        # Index unverified members from the member cache, rather than crawling them when needed
+        index_unverified(guild)
+        lap("members")
+
+        # The verify button is persistent, so the prompt only needs posting where none was recorded
+        if guild.id not in prompted_guilds:
+            await post_verification_message(guild)
+        lap("prompt")
+    except Exception as ex:
+        Log.error(f"Warming up {guild.name}[{guild.id}] failed: {ex}\n{traceback.format_exc()}")
+    finally:
+        # Release anything queued behind this guild, even if part of the warm-up failed
+        get_guild_ready(guild.id).set()
+
+    return timings
+
+
+def register_bot_messages(kind: str, *messages: discord.Message):
+    """Remember messages the bot posted so they can be replaced by ID later.
+
+    Args:
+        kind (str): What the messages are, e.g. 'verify', 'welcome' or 'weekly'.
+        *messages (discord.Message): The messages.
+    """
+    for message in messages:
+        session.add(
+            DbBotMessage(
+                guild_id=message.guild.id,
+                channel_id=message.channel.id,
+                message_id=message.id,
+                kind=kind,
+            )
+        )
+    try:
+        session.commit()
+    except Exception as ex:
+        session.rollback()
+        Log.error(f"An error occurred: {ex}\n{traceback.format_exc()}")
+
+
+async def delete_bot_messages(channel: discord.TextChannel, kind: str, legacy_match=None):
+    """Delete the messages of a kind the bot registered in a channel's guild.
+
+    Messages posted before the registry existed aren't in it, so if nothing is registered
+    the channel's history is searched once with `legacy_match` instead.
+
+    Args:
+        channel (discord.TextChannel): Channel the messages are in.
+        kind (str): What the messages are.
+        legacy_match (function, optional): Given a message from the history, whether to delete it.
+    """
+    rows = session.query(DbBotMessage).filter_by(guild_id=channel.guild.id, kind=kind).all()
+
+    if not rows and legacy_match:
+        async for msg in channel.history():
+            if legacy_match(msg):
+                try:
+                    await msg.delete()
+                except discord.errors.NotFound:
+                    pass
+        return
+
+    for row in rows:
+        target = bot.get_channel(row.channel_id) or channel
+        try:
+            await target.get_partial_message(row.message_id).delete()
+        except discord.errors.NotFound:
+            pass
+        except discord.HTTPException as ex:
+            Log.warning(f"Couldn't delete {kind} message {row.message_id} in {channel.guild.name}[{channel.guild.id}]: {ex}")
+        session.delete(row)
+    try:
+        session.commit()
+    except Exception as ex:
+        session.rollback()
+        Log.error(f"An error occurred: {ex}\n{traceback.format_exc()}")
+
+
+async def post_verification_message(guild: discord.Guild):
+    """Replace the verification prompt in a guild's landing channel.
+
+    Args:
+        guild (discord.Guild): The guild.
+    """
+    landing = guild_to_landing.get(guild.id)
+    if not landing:
+        return
+
+    # Delete old verification message
+    await delete_bot_messages(
+        landing, "verify", legacy_match=lambda msg: msg.author == bot.user
+    )
+
+    # Create a view that will contain a button which can be used to initialize the verification process
+    view = VerifyView()
+    message = await landing.send(content=VERIFICATION_MESSAGE, view=view)
+    register_bot_messages("verify", message)
+
+
+def get_announcements_channel(guild: discord.Guild):
+    """Find a residence hall server's #announcements channel, in the info category."""
+    return discord.utils.find(
+        lambda c: c.name == 'announcements' and c.category and c.category.name == 'info',
+        guild.channels,
+    )
+
+
+async def send_broadcast(message: str, ping_role: str = None, image_url: str = None):
+    """Post a message to #announcements in every residence hall server.
+
+    Args:
+        message (str): The message.
+        ping_role (str, optional): Name of a role to ping in each server.
+        image_url (str, optional): Image to attach.
+
+    Raises:
+        util.images.ImageError: If the image couldn't be used.
+    """
+    # Download the image once, rather than once per guild
+    image = None
+    if image_url:
+        image, extension = await util.images.load_image(image_url)
+
+    # Iterates through residence hall servers, skipping hub server
+    for guild in bot.guilds:
+        if guild.id == HUB_SERVER_ID:
+            continue
+        # Finds the role to ping
+        mention_string = ""
+        if ping_role:
+            role = discord.utils.get(guild.roles, name=ping_role)
+            if role:
+                mention_string = role.mention
+        # Finds the announcements channel and sends the message
+        channel = get_announcements_channel(guild)
+        if not channel:
+            continue
+        if image:
+            # Create a discord.File object
+            file = File(fp=BytesIO(image), filename=f'image.{extension}')
+            await channel.send(content=message + "\n" + mention_string, file=file)
+        else:
+            await channel.send(content=message + "\n" + mention_string)
+
+
+def schedule_event_reminder(hub_event: discord.ScheduledEvent):
+    """Schedule (or move) the reminder sent to residents shortly before a hub event starts."""
+    remind_at = hub_event.start_time - EVENT_REMINDER_LEAD
+    if hub_event.status.name != "scheduled" or remind_at <= discord.utils.utcnow():
+        scheduler.cancel(f"event_reminder:{hub_event.id}")
+        return
+    scheduler.schedule(
+        "event_reminder",
+        remind_at,
+        payload={"hub_event_id": hub_event.id},
+        key=f"event_reminder:{hub_event.id}",
+    )
+
+
+async def announce_event_starting(payload: dict):
+    """Scheduled job: tell residents that an event is about to start."""
+
+    async def announce(guild: discord.Guild, clone: discord.ScheduledEvent):
+        channel = get_announcements_channel(guild)
+        if channel and clone.status.name == "scheduled":
+            await channel.send(
+                f"**{clone.name}** starts {discord.utils.format_dt(clone.start_time, 'R')}! {clone.url}"
+            )
+
+    await asyncio.gather(
+        *(announce(guild, clone) for guild, clone in get_event_clones(payload["hub_event_id"]))
+    )
+
+
+async def send_scheduled_broadcast(payload: dict):
+    """Scheduled job: send a broadcast that was delayed with /broadcast."""
+    await send_broadcast(payload["message"], payload.get("ping_role"), payload.get("image_url"))
+    bot_commands = bot.get_channel(BOT_COMMANDS_ID)
+    if bot_commands:
+        await bot_commands.send("Scheduled broadcast sent.")
+
+
+def schedule_weekly_announcement():
+    """Make sure the recurring weekly announcement job exists, first running at the next announcement time."""
+    if scheduler.get("weekly_announcement"):
+        return
+    now = discord.utils.utcnow()
+    first = now.replace(hour=WEEKLY_ANNOUNCEMENT_HOUR, minute=0, second=0, microsecond=0)
+    first += datetime.timedelta(days=(WEEKLY_ANNOUNCEMENT_WEEKDAY - now.weekday()) % 7)
+    if first <= now:
+        first += datetime.timedelta(days=7)
+    scheduler.schedule(
+        "weekly_announcement",
+        first,
+        interval=datetime.timedelta(days=7),
+        key="weekly_announcement",
+    )
+
+
+async def post_weekly_announcements():
+    """Replace the weekly announcement of upcoming events in every residence hall server."""
+    now = discord.utils.utcnow()
+    for guild in bot.guilds:
+        if guild.id == HUB_SERVER_ID:
+            continue
+        channel = get_announcements_channel(guild)
+        if not channel:
+            continue
+
+        # Delete old announcements
+        await delete_bot_messages(
+            channel,
+            "weekly",
+            legacy_match=lambda msg: msg.author == bot.user and util.announcements.WEEKLY_ANNOUNCEMENT_HEADER in msg.content,
+        )
+
+        announcement = util.announcements.build_weekly_announcement(
+            guild.scheduled_events,
+            residents_role=discord.utils.get(guild.roles, name='residents'),
+            now=now,
+        )
+        if announcement:
+            register_bot_messages("weekly", await channel.send(content=announcement))
+
+
+async def setup_guild(guild: discord.Guild):
+    """Initialize the information the bot needs in a guild: landing channel, invite cache,
+    RA role and database row, then post the verification and welcome messages.
+
+    Args:
+        guild (discord.Guild): The guild to set up.
+    """
+    # Track the landing channel (verify) of the server
+    guild_to_landing[guild.id] = discord.utils.get(
+        guild.channels, name="verify"
+    )
+    # Log.info(f"{guild_to_landing=}")
+
+    # Cache the invites for the guild as they currently stand (none should be present)
+    invites_cache[guild.id] = await guild.invites()
+
+    # Start tracking the members that have yet to verify
+    index_unverified(guild)
+    get_guild_ready(guild.id).set()
+
+    ra_role = discord.utils.get(guild.roles, name="RA")
+
+    if not ra_role:
+        try:
+            ra_role = await guild.create_role(
+                name="RA",
+                hoist=True,
+                permissions=discord.Permissions.advanced(),
+                color=discord.Colour.red(),
+            )
+        except discord.Forbidden:
+            Log.warning(
+                f"Attempted to create an RA role in {guild.name}[{guild.id}] but do not have valid permissions."
+            )
+
+    this_guild = DbGuild(
+        ID=guild.id,
+        is_setup=True,
+        ra_role_id=ra_role.id if ra_role else None,
+        landing_channel_id=guild_to_landing[guild.id].id,
+    )
+
+    session.merge(this_guild)
+
+    try:
+        Log.info(f"Attempting to merge {this_guild} into the database...")
+        session.commit()
+    except IntegrityError as int_exception:
+        session.rollback()
+        Log.warning(
+            "Attempting to merge an already existent guild into the database failed:"
+        )
+        print(int_exception.with_traceback())
+
+    # Replace the verification prompt
+    await post_verification_message(guild)
+
+    # Setup welcome message
+    welcome_channel = discord.utils.get(guild.channels, name="welcome")
+    if not welcome_channel:
+        Log.warning(f"Guild {guild.name}[{guild.id}] does not have a channel named 'welcome'")
+        return
+    await delete_bot_messages(welcome_channel, "welcome")
+    welcome_image = await welcome_channel.send(file=discord.File("welcome.png"))
+    welcome_text = await welcome_channel.send("""Here, you can stay informed of events and programs, chat with other residents, play games, watch movies, and so much more!
+
+**Not sure how to use Discord?**
+No problem! Check out this article for help:
+https://support.discord.com/hc/en-us/articles/360045138571-Beginner-s-Guide-to-Discord
+
+**Rules**
+As a reminder, you must follow the Student Code of Conduct on this server. Our goal is to create a supportive, inclusive community for everyone. If you violate the Code of Conduct, you may be subject to removal from this server. The code of conduct can be found here:
+https://www.studentaffairs.pitt.edu/wp-content/uploads/2021/09/2021_Academic-Year_Linked.pdf
+
+We hope you have a great year! Contact your RA if you have any questions.""")
+    register_bot_messages("welcome", welcome_image, welcome_text)
+
+
+async def create_forum(guild: discord.Guild):
+    """Create the 'questions' forum channel in the 'building' category and set up its tags.
+
+    Args:
+        guild (discord.Guild): The guild to add the forum to.
+    """
+    category = discord.utils.get(guild.categories, name='building')
+    topic = """
+# Welcome to the forum!
+Here, you can ask any question you like and we will do our best to answer it!
+
+### Directions
+* Make a post with the question in the title
+* Add any additional information in the description
+* Add a relevant tag to your post
+* Post it!
+"""
+    
+    # Create ForumTag objects
+    tag_data = {
+        'general': '🔖',
+        'food': '🥕',
+        'entertainment': '🎉',
+        'housing': '🏠',
+        'transportation': '🚌',
+        'tech': '💻',
+        'classes': '📚',
+    }
+    tags = [discord.ForumTag(name=name, moderated=False, emoji=discord.PartialEmoji(name=emoji)) for name, emoji in tag_data.items()]
+
+    forum_channel = await guild.create_forum_channel('questions', category=category)
+    await forum_channel.edit(position=4, topic=topic, available_tags=tags)
+
+
 # ------------------------------- COMMANDS -------------------------------
 
 # This has to, for some reason, stay here,
@@ -588,6 +1632,14 @@ async def verify(ctx):
         )
         return
 
+    # The interaction must be answered within 3 seconds, so only wait briefly for a guild that is starting up
+    if not await wait_for_guild(guild.id, timeout=2.0):
+        await ctx.response.send_message(
+            "The bot is still starting up in this server. Please press the green 'verify' button again in a few seconds.",
+            ephemeral=True,
+        )
+        return
+
     # Get invite snapshot ASAP after guild is determined
     # Invites after user joined.
     # Notice that these snapshots will only be used in the
@@ -947,11 +1999,29 @@ async def make_categories(
     link: discord.Option(
         str,
         description="URL to raw hastebin or pastebin page with list of RAs in format 'lastname firstname' per line",
+        required=False,
+        default=None,
+    ),
+    roster: discord.Option(
+        discord.Attachment,
+        description="A .txt or .csv file with one RA per line, 'lastname firstname' or 'lastname, firstname'",
+        required=False,
+        default=None,
+    ),
+    dry_run: discord.Option(
+        bool,
+        description="Preview the communities that would be made without creating anything",
+        required=False,
+        default=False,
+    ),
+    report_format: discord.Option(
+        str,
+        description="Format of the RA to invite link file",
+        choices=["txt", "csv"],
+        required=False,
+        default="txt",
     ),
 ):
-    # Necessary because of Python's dynamic name binding and the way '|=' works
-    global category_to_role
-
     # Defer a response to prevent the 3 second timeout gate from being closed.
     await ctx.defer()
 
@@ -960,97 +2030,333 @@ async def make_categories(
     # a graceful close just in case)
     if ctx.guild:
         guild = ctx.guild
-        # Read the list of RAs from a RAW hastebin file. It is SIGNIFICANT that the
-        # link is to a RAW hastebin, or it will not be parsed correctly.
-        if "raw" not in link:
-            await ctx.send_followup(
-                "Uh oh! You need to send a `raw` hastebin link. Click the 'Just Text' button on hastebin to get one.",
-                ephemeral=True,
-            )
-            return
 
-        # Guard request in case of status code fail
+        # Read the list of RAs line by line from the attachment or RAW hastebin link
+        ras = []
+        invalid_lines = []
         try:
-            ras = util.invites.read_from_haste(link)
-        except requests.RequestException:
+            line_number = 0
+            async for line in util.rosters.read_lines(link=link, attachment=roster):
+                line_number += 1
+                try:
+                    ra_line = util.rosters.clean_ra_line(line)
+                except ValueError as ex:
+                    invalid_lines.append(f"Line {line_number}: {ex}")
+                    continue
+                if ra_line:
+                    ras.append(ra_line)
+        except util.rosters.RosterError as ex:
+            await ctx.send_followup(str(ex), ephemeral=True)
+            return
+        # Guard request in case of status code fail
+        except FetchError:
             await ctx.send_followup(
                 "The given link returned a failure status code when queried. Are you sure it's valid?",
                 ephemeral=True,
             )
             return
 
-        # Make the categories. This also makes their channels, the roles, and a text file
-        # called 'ras-with-links.txt' that returns the list of RAs with the associated invite links.
-        invite_role_dict, category_role_dict = await util.invites.make_categories(
-            guild, ras, guild_to_landing[guild.id]
-        )
+        if dry_run:
+            preview = [
+                f"{ra_line} -> RA {util.invites.parse_ra_first_name(ra_line).title()}'s Community"
+                for ra_line in ras
+            ]
+            if invalid_lines:
+                preview += ["", "These lines would stop the run:"] + invalid_lines
+            await send_report(
+                ctx,
+                f"**Dry run:** {len(ras)} communities would be created.",
+                preview,
+                "make-categories-preview.txt",
+            )
+            return
 
-        # Check that categories were generated correctly
-        if not category_role_dict:
-            await ctx.send_followp(
-                "Failed to associate categories to their roles. This is an internal error.",
-                ephemeral=True,
+        if invalid_lines:
+            await send_report(
+                ctx,
+                f"**{len(invalid_lines)} lines of the roster couldn't be read.** Fix them and try again, nothing was created.",
+                invalid_lines,
+                "invalid-lines.txt",
             )
-            Log.error(
-                "Failed to associate categories to their roles. This is an internal error."
+            return
+
+        if not ras:
+            await ctx.send_followup("The roster is empty.", ephemeral=True)
+            return
+
+        if guild.id in provisioning_cancel_events:
+            await ctx.send_followup(
+                "Communities are already being created in this server. Use `/cancel_provisioning` to stop that run first.",
+                ephemeral=True,
             )
             return
 
+        job, result, provisioning_time = await provision_communities(guild, ras)
+
         # Check that invites were generated correctly
-        if not invite_role_dict:
-            await ctx.send_followp(
+        if not result:
+            await ctx.send_followup(
                 "Failed to make invites. Check that a #verify channel exists.",
                 ephemeral=True,
             )
             Log.error("Failed to generate any new invites.")
             return
 
-        # Update category to role cache with newly generated categories
-        category_to_role |= category_role_dict
+        _, category_role_dict, ras_with_links = result
 
-        # Serialize new items added to category_to_role here
-        for category_id, role_id in category_role_dict.items():
-            category_obj = DbCategory(ID=category_id, role_id=role_id)
+        # Check that categories were generated correctly
+        if not category_role_dict:
+            await ctx.send_followup(
+                "Failed to associate categories to their roles. This is an internal error.",
+                ephemeral=True,
+            )
+            Log.error(
+                "Failed to associate categories to their roles. This is an internal error."
+            )
+            return
 
-            try:
-                session.merge(category_obj)
-            except Exception:
-                Log.error(f"Couldn't merge {{{category_id}:{role_id}}} to database.")
-        try:
-            session.commit()
-        except Exception:
-            session.rollback()
-            Log.error(f"Couldn't merge any categories into to database.")
-
-        # Update invite cache, important for on_member_join's functionality
-        invites_cache[guild.id] = await guild.invites()
-
-        # Iterate over the invites, adding the new role object
-        # to our global dict if it was just created.
-        for invite in invites_cache[guild.id]:
-            if invite.code in invite_role_dict:
-                invite_obj = DbInvite(
-                    code=invite.code,
-                    guild_id=guild.id,
-                    role_id=invite_role_dict[invite.code].id,
-                )
-                session.merge(invite_obj)
-                invite_to_role[invite.code] = invite_role_dict[invite.code]
-        try:
-            session.commit()
-        except Exception as ex:
-            session.rollback()
-            Log.error(f"An error occurred: {ex}\n{traceback.format_exc()}")
+        num_completed = sum(1 for item in job.items if item.completed)
 
         # Upload the file containing the links and ra names as an attachment, so they
         # can be distributed to the RAs to share.
-        await ctx.send_followup(file=discord.File("ras-with-links.txt"))
+        if job.status == "completed":
+            summary = f"Created {len(category_role_dict)} communities in {provisioning_time:.1f}s."
+        else:
+            summary = (
+                f"Provisioning {job.status}: {num_completed} of {job.total} communities are ready ({provisioning_time:.1f}s). "
+                "Run this command again with the same list to resume where it left off."
+            )
+        await ctx.send_followup(
+            content=summary,
+            file=util.invites.build_link_report(ras_with_links, as_csv=report_format == "csv"),
+        )
     else:
         await ctx.respond(
             "Sorry! This command has to be used in a guild context.", ephemeral=True
         )
 
 
+@bot.slash_command(
+    description="Bring every residence hall server's shared channels and roles in line with the hub (hub only)."
+)
+@discord.guild_only()
+@discord.ext.commands.has_permissions(administrator=True)
+async def sync_template(
+    ctx,
+    apply: discord.Option(
+        bool,
+        description="Make the changes. Otherwise only the changes that would be made are listed.",
+        required=False,
+        default=False,
+    ),
+):
+    if ctx.guild.id != HUB_SERVER_ID:
+        await ctx.respond("This command can only be used in the hub server.", ephemeral=True)
+        return
+
+    # Defer a response to prevent the 3 second timeout gate from being closed.
+    await ctx.defer()
+
+    # Only the shared channels, categories and roles are taken from the hub, see util.templates
+    template = util.templates.snapshot_guild(ctx.guild)
+
+    residence_guilds = [guild for guild in bot.guilds if guild.id != HUB_SERVER_ID]
+    diffs = {
+        guild.id: util.templates.diff_template(template, util.templates.snapshot_guild(guild))
+        for guild in residence_guilds
+    }
+
+    failures = {}
+    started = datetime.datetime.now()
+    if apply:
+        results = await asyncio.gather(
+            *(util.templates.apply_diff(guild, diffs[guild.id]) for guild in residence_guilds)
+        )
+        failures = {guild.id: result for guild, result in zip(residence_guilds, results)}
+    elapsed = (datetime.datetime.now() - started).total_seconds()
+
+    lines = []
+    for guild in residence_guilds:
+        failed = failures.get(guild.id, [])
+        lines.append(f"{guild.name}: {len(diffs[guild.id])} changes" + (f", {len(failed)} failed" if failed else ""))
+        for operation in diffs[guild.id]:
+            lines.append(f"    {util.templates.describe_operation(operation)}")
+        for operation, ex in failed:
+            lines.append(f"    FAILED {util.templates.describe_operation(operation)}: {ex}")
+
+    total = sum(len(operations) for operations in diffs.values())
+    if apply:
+        header = f"Applied {total} changes across {len(residence_guilds)} servers in {elapsed:.1f}s."
+    else:
+        header = f"**Preview:** {total} changes would be made across {len(residence_guilds)} servers. Run with `apply` to make them."
+    await send_report(ctx, header, lines, "template-changes.txt")
+
+
+@bot.slash_command(
+    description="Stop a make_categories run in progress. It can be resumed by running it again."
+)
+@discord.guild_only()
+@discord.ext.commands.has_permissions(administrator=True)
+async def cancel_provisioning(ctx):
+    cancel_event = provisioning_cancel_events.get(ctx.guild.id)
+
+    if not cancel_event:
+        await ctx.respond(
+            "No communities are being created in this server right now.", ephemeral=True
+        )
+        return
+
+    cancel_event.set()
+    Log.info(f"Provisioning in {ctx.guild.name}[{ctx.guild.id}] was cancelled by {ctx.user.name}[{ctx.user.id}]")
+    await ctx.respond(
+        "Cancelling. Communities already being made will be finished, the rest will be skipped.",
+        ephemeral=True,
+    )
+
+
+@bot.slash_command(
+    description="Set up every residence hall server and create its RA communities at once (hub only)."
+)
+@discord.guild_only()
+@discord.ext.commands.has_permissions(administrator=True)
+async def provision_all(
+    ctx,
+    rosters: discord.Option(
+        discord.Attachment,
+        description="A .txt file with each server's RAs listed under a [server name or ID] line",
+    ),
+    dry_run: discord.Option(
+        bool,
+        description="Check the rosters without changing any server",
+        required=False,
+        default=False,
+    ),
+):
+    if ctx.guild.id != HUB_SERVER_ID:
+        await ctx.respond("This command can only be used in the hub server.", ephemeral=True)
+        return
+
+    # Defer a response to prevent the 3 second timeout gate from being closed.
+    await ctx.defer()
+
+    try:
+        guild_rosters, invalid_lines = await util.rosters.read_guild_rosters(rosters)
+    except util.rosters.RosterError as ex:
+        await ctx.send_followup(str(ex), ephemeral=True)
+        return
+    except FetchError:
+        await ctx.send_followup("The attached file couldn't be downloaded. Please try again.", ephemeral=True)
+        return
+
+    # Match each section of the file to a residence hall server by ID or name
+    residence_guilds = [guild for guild in bot.guilds if guild.id != HUB_SERVER_ID]
+    targets = {}
+    for header, ras in guild_rosters.items():
+        guild = discord.utils.find(
+            lambda g: str(g.id) == header or g.name.lower() == header.lower(),
+            residence_guilds,
+        )
+        if not guild:
+            invalid_lines.append(f"[{header}]: no residence hall server has that name or ID")
+        elif guild.id in targets:
+            invalid_lines.append(f"[{header}]: {guild.name} is listed more than once")
+        elif guild.id in provisioning_cancel_events:
+            invalid_lines.append(f"[{header}]: communities are already being created in {guild.name}")
+        elif not ras:
+            invalid_lines.append(f"[{header}]: the roster is empty")
+        else:
+            targets[guild.id] = (guild, ras)
+
+    if dry_run or invalid_lines or not targets:
+        lines = [f"{guild.name}: {len(ras)} communities" for guild, ras in targets.values()]
+        if invalid_lines:
+            lines += ["", "Problems:"] + invalid_lines
+        if dry_run:
+            header = f"**Dry run:** {len(targets)} servers would be provisioned."
+        else:
+            header = "**The rosters have problems.** Fix them and try again, no server was changed."
+        await send_report(ctx, header, lines, "provision-all.txt")
+        return
+
+    # Claim every server before the first await, so a make_categories started meanwhile sees it as busy
+    cancel_events = {guild_id: asyncio.Event() for guild_id in targets}
+    provisioning_cancel_events.update(cancel_events)
+
+    progress = {
+        guild.id: {"stage": "queued", "done": 0, "total": len(ras)}
+        for guild, ras in targets.values()
+    }
+    reports = []
+
+    def progress_embed(title: str, colour: discord.Colour):
+        embed = discord.Embed(title=title, color=colour)
+        embed.description = "\n".join(
+            f"**{targets[guild_id][0].name}**: {state['stage']} ({state['done']}/{state['total']})"
+            for guild_id, state in progress.items()
+        )
+        return embed
+
+    async def provision_guild(guild: discord.Guild, ras: list[str]):
+        state = progress[guild.id]
+
+        def on_ra_done(completed, total):
+            state["done"] = completed
+
+        try:
+            exists_guild = session.query(DbGuild).filter_by(ID=guild.id).first()
+            if not (exists_guild and exists_guild.is_setup):
+                state["stage"] = "setting up"
+                await setup_guild(guild)
+
+            state["stage"] = "creating communities"
+            job, result, provisioning_time = await provision_communities(
+                guild, ras, on_ra_done=on_ra_done, cancel_event=cancel_events[guild.id]
+            )
+            if not result:
+                state["stage"] = "❌ no #verify channel"
+                return
+            reports.append(
+                util.invites.build_link_report(result[2], name=f"ras-with-links-{guild.id}")
+            )
+
+            if not discord.utils.get(guild.forum_channels, name="questions"):
+                state["stage"] = "adding forum"
+                await create_forum(guild)
+
+            status = "✅" if job.status == "completed" else "⚠️"
+            state["stage"] = f"{status} {job.status} in {provisioning_time:.1f}s"
+        except Exception as ex:
+            state["stage"] = f"❌ {str(ex)[:100]}"
+            Log.error(f"Provisioning {guild.name}[{guild.id}] failed: {ex}\n{traceback.format_exc()}")
+
+    started = datetime.datetime.now()
+    try:
+        message = await ctx.send_followup(
+            embed=progress_embed("Provisioning residence hall servers...", discord.Colour.blurple())
+        )
+
+        # Every guild is provisioned at once; make_categories bounds the work within each guild
+        await show_progress(
+            message,
+            asyncio.gather(*(provision_guild(guild, ras) for guild, ras in targets.values())),
+            lambda: progress_embed("Provisioning residence hall servers...", discord.Colour.blurple()),
+        )
+    finally:
+        # Servers whose setup failed never reached provision_communities, which releases the rest
+        for guild_id, cancel_event in cancel_events.items():
+            release_provisioning(guild_id, cancel_event)
+
+    elapsed = (datetime.datetime.now() - started).total_seconds()
+    Log.ok(f"Provisioned {len(targets)} residence hall servers in {elapsed:.1f}s")
+    await message.edit(
+        embed=progress_embed(f"Provisioned {len(targets)} servers in {elapsed:.1f}s", discord.Colour.green())
+    )
+
+    # Discord allows at most 10 attachments per message
+    for i in range(0, len(reports), 10):
+        await ctx.send_followup(files=reports[i:i + 10])
+
+
 @bot.slash_command(
     description="Manually begin initializing necessary information for the bot to work in this server."
 )
@@ -1078,71 +2384,7 @@ async def setup(ctx):
             )
             return
 
-    # Track the landing channel (verify) of the server
-    guild_to_landing[ctx.guild.id] = discord.utils.get(
-        ctx.guild.channels, name="verify"
-    )
-    # Log.info(f"{guild_to_landing=}")
-
-    # Cache the invites for the guild as they currently stand (none should be present)
-    invites_cache[ctx.guild.id] = await ctx.guild.invites()
-
-    ra_role = discord.utils.get(ctx.guild.roles, name="RA")
-
-    if not ra_role:
-        try:
-            ra_role = await ctx.guild.create_role(
-                name="RA",
-                hoist=True,
-                permissions=discord.Permissions.advanced(),
-                color=discord.Colour.red(),
-            )
-        except discord.Forbidden:
-            await ctx.followup.send(
-                "Attempted to create an RA role but do not have valid permissions.",
-                ephemeral=True,
-            )
-
-    this_guild = DbGuild(
-        ID=ctx.guild.id,
-        is_setup=True,
-        ra_role_id=ra_role.id,
-        landing_channel_id=guild_to_landing[ctx.guild.id].id,
-    )
-
-    session.merge(this_guild)
-
-    try:
-        Log.info(f"Attempting to merge {this_guild} into the database...")
-        session.commit()
-    except IntegrityError as int_exception:
-        session.rollback()
-        Log.warning(
-            "Attempting to merge an already existent guild into the database failed:"
-        )
-        print(int_exception.with_traceback())
-
-    # Create a view that will contain a button which can be used to initialize the verification process
-    view = VerifyView()
-    async for msg in guild_to_landing[ctx.guild.id].history():
-        if msg.author == bot.user and msg.content == VERIFICATION_MESSAGE:
-            await msg.delete()
-    await guild_to_landing[ctx.guild.id].send(VERIFICATION_MESSAGE, view=view)
-
-    # Setup welcome message
-    welcome_channel = discord.utils.get(ctx.guild.channels, name="welcome")
-    await welcome_channel.send(file=discord.File("welcome.png"))
-    await welcome_channel.send("""Here, you can stay informed of events and programs, chat with other residents, play games, watch movies, and so much more!
-
-**Not sure how to use Discord?**
-No problem! Check out this article for help:
-https://support.discord.com/hc/en-us/articles/360045138571-Beginner-s-Guide-to-Discord
-
-**Rules**
-As a reminder, you must follow the Student Code of Conduct on this server. Our goal is to create a supportive, inclusive community for everyone. If you violate the Code of Conduct, you may be subject to removal from this server. The code of conduct can be found here:
-https://www.studentaffairs.pitt.edu/wp-content/uploads/2021/09/2021_Academic-Year_Linked.pdf
-
-We hope you have a great year! Contact your RA if you have any questions.""")
+    await setup_guild(ctx.guild)
 
     # Finished
     await ctx.respond("Setup finished.", ephemeral=True)
@@ -1158,14 +2400,10 @@ async def fix_welcome(ctx):
     welcome_channel = discord.utils.get(ctx.guild.channels, name="welcome")
 
     #delete the old one
-    async for msg in welcome_channel.history():
-        try:
-            await msg.delete()
-        except discord.errors.NotFound:
-            pass
+    await delete_bot_messages(welcome_channel, "welcome", legacy_match=lambda msg: True)
 
-    await welcome_channel.send(file=discord.File("welcome.png"))
-    await welcome_channel.send("""Here, you can stay informed of events and programs, chat with other residents, play games, watch movies, and so much more!
+    welcome_image = await welcome_channel.send(file=discord.File("welcome.png"))
+    welcome_text = await welcome_channel.send("""Here, you can stay informed of events and programs, chat with other residents, play games, watch movies, and so much more!
 
 **Not sure how to use Discord?**
 No problem! Check out [this article for help](https://support.discord.com/hc/en-us/articles/360045138571-Beginner-s-Guide-to-Discord).
@@ -1174,6 +2412,7 @@ No problem! Check out [this article for help](https://support.discord.com/hc/en-
 As a reminder, you must follow the Student Code of Conduct on this server. Our goal is to create a supportive, inclusive community for everyone. If you violate the Code of Conduct, you may be subject to removal from this server. The code of conduct can be found [here](https://www.studentaffairs.pitt.edu/wp-content/uploads/2023/04/Student-Code-of-Conduct-Published_11.18.22.pdf).
 
 We hope you have a great year! Contact your RA if you have any questions.""")
+    register_bot_messages("welcome", welcome_image, welcome_text)
 
     # Finished
     await ctx.respond("Task completed.", ephemeral=True)
@@ -1506,6 +2745,34 @@ async def lookup(ctx, member: discord.Option(discord.Member, "User to lookup")):
     await ctx.respond(embed=embed)
 
 
+@bot.slash_command(
+    description="Export every user the bot has a record of as a compressed CSV file."
+)
+@discord.guild_only()
+@discord.ext.commands.has_permissions(administrator=True)
+async def export_users(ctx):
+    if ctx.guild.id != HUB_SERVER_ID:
+        await ctx.respond("This command can only be used in the hub server.", ephemeral=True)
+        return
+    await send_export(ctx, util.exports.export_users, "users.csv.gz")
+
+
+@bot.slash_command(
+    description="Export event subscribers as a compressed CSV file."
+)
+@discord.guild_only()
+@discord.ext.commands.has_permissions(administrator=True)
+async def export_subscribers(
+    ctx,
+    event_number: discord.Option(int, "Only export subscribers of this event number", required=False, default=None),
+):
+    if ctx.guild.id != HUB_SERVER_ID:
+        await ctx.respond("This command can only be used in the hub server.", ephemeral=True)
+        return
+    filename = f"subscribers-{event_number}.csv.gz" if event_number is not None else "subscribers.csv.gz"
+    await send_export(ctx, util.exports.export_subscribers, filename, event_number)
+
+
 @bot.slash_command(
     description="Manually drop a user from the database/remove them from verification list."
 )
@@ -1522,6 +2789,7 @@ async def reset_user(
 ):
     try:
         user_count = session.query(DbUser).filter_by(ID=member.id).delete()
+        user_to_email.pop(member.id, None)
     except:
         user_count = 0
         await ctx.respond(
@@ -1579,18 +2847,55 @@ async def reset_user(
     description="Kicks all members that have not verified."
 )
 @discord.ext.commands.has_permissions(administrator=True)
-async def prune_pending(ctx):
+async def prune_pending(
+    ctx,
+    dry_run: discord.Option(bool, "List who would be pruned without kicking anyone", required=False, default=False),
+):
     # Get logs channel
     logs_channel = discord.utils.get(ctx.guild.channels, name="logs")
 
     # Defer response due to slow operation
     await ctx.defer(ephemeral=True)
 
-    # Iterate over members
-    num_pruned = 0
+    # Iterate over unverified members
+    to_prune = get_unverified(ctx.guild)
+
+    if dry_run:
+        await send_report(
+            ctx,
+            f"**Dry run:** {len(to_prune)} members would be pruned.",
+            [f"{member} [{member.id}]" for member in to_prune],
+            "members-to-prune.txt",
+            ephemeral=True,
+        )
+        return
+
+    progress = {"total": len(to_prune), "notified": 0, "pruned": 0, "verified": 0}
     pruned = []
-    async for member in ctx.guild.fetch_members():
-        if len(member.roles) <= 1:
+
+    async def notify(member):
+        if not refresh_unverified(member):
+            return
+        await dm_outbox.enqueue(
+            member.id,
+            f"Hey there! It looks like you didn't verify yourself as a resident when you joined the server {ctx.guild.name}. Please re-join with the invite your RA sent you and press the green verify button once you join.",
+            dedup_key=f"prune:{ctx.guild.id}",
+            guild_id=ctx.guild.id,
+        )
+        progress["notified"] += 1
+
+    async def prune():
+        # Notify them through the outbox, and wait until they have been, since
+        # they can't be DMed once they no longer share a server with the bot
+        await asyncio.gather(*(notify(member) for member in to_prune))
+
+        for member in to_prune:
+            # Sending the DMs can take minutes, so skip anyone who verified or left in the meantime
+            member = refresh_unverified(member)
+            if not member:
+                progress["verified"] += 1
+                continue
+
             # Member will be pruned
             Log.info(
                 f"Pruning member {member.name}[{member.id}] as they have one or fewer roles (@/everyone)"
@@ -1600,32 +2905,6 @@ async def prune_pending(ctx):
                     f"Pruning member {member.name}[{member.id}] as they have one or fewer roles (@/everyone)"
                 )
 
-            # Get DM channel
-            dm_channel = await member.create_dm()
-
-            # Notify them
-            if dm_channel:
-                try:
-                    await dm_channel.send(
-                        f"Hey there! It looks like you didn't verify yourself as a resident when you joined the server {ctx.guild.name}. Please re-join with the invite your RA sent you and press the green verify button once you join."
-                    )
-                except discord.Forbidden:
-                    Log.warning(
-                        f"Member {member.name}[{member.id}] does not allow DMs or creating a DM failed, could not notify them of prune."
-                    )
-                    if logs_channel:
-                        await logs_channel.send(
-                            f"**WARNING**: Member {member.name}[{member.id}] does not allow DMs or creating a DM failed, could not notify them of prune."
-                        )
-            else:
-                Log.warning(
-                    f"Member {member.name}[{member.id}] does not allow DMs or creating a DM failed, could not notify them of prune."
-                )
-                if logs_channel:
-                    await logs_channel.send(
-                        f"**WARNING**: Member {member.name}[{member.id}] does not allow DMs or creating a DM failed, could not notify them of prune."
-                    )
-
             # Kick member
             try:
                 await member.kick(reason="Pruned for not initiating verification")
@@ -1635,81 +2914,147 @@ async def prune_pending(ctx):
                 )
                 continue
 
-            num_pruned += 1
-            pruned.append(member)
-
-    # Respond with ephemeral list of members pruned
-    message_content = f"**{num_pruned} members were pruned:**\n"
+            progress["pruned"] += 1
+            pruned.append(member)
 
-    for mem in pruned:
-        message_content += f"{mem}\n"
+    message = await ctx.send_followup(
+        embed=member_progress_embed("Pruning unverified members...", discord.Colour.blurple(), progress),
+        ephemeral=True,
+    )
+    await show_progress(
+        message,
+        prune(),
+        lambda: member_progress_embed("Pruning unverified members...", discord.Colour.blurple(), progress),
+    )
+    await message.edit(
+        embed=member_progress_embed("Finished pruning unverified members", discord.Colour.green(), progress)
+    )
 
-    # Reply with members pruned
-    await ctx.followup.send(content=message_content, ephemeral=True)
+    # Respond with ephemeral list of members pruned
+    header = f"**{len(pruned)} members were pruned:**"
+    if progress["verified"]:
+        header = f"**{len(pruned)} members were pruned, {progress['verified']} verified or left first:**"
+    await send_report(
+        ctx,
+        header,
+        [f"{member} [{member.id}]" for member in pruned],
+        "pruned-members.txt",
+        ephemeral=True,
+    )
 
 
 @bot.slash_command(
     description="Help users get verified by reminding them."
 )
 @discord.ext.commands.has_permissions(administrator=True)
-async def assist_verification(ctx):
+async def assist_verification(
+    ctx,
+    dry_run: discord.Option(bool, "List who would be reminded without sending anything", required=False, default=False),
+):
     # Get logs channel
     logs_channel = discord.utils.get(ctx.guild.channels, name="logs")
 
     # Defer response due to slow operation
     await ctx.defer(ephemeral=True)
 
-    # Iterate over members
-    num_notified = 0
+    # Iterate over unverified members
+    to_remind = get_unverified(ctx.guild)
+
+    if dry_run:
+        await send_report(
+            ctx,
+            f"**Dry run:** {len(to_remind)} members would be reminded.",
+            [f"{member} [{member.id}]" for member in to_remind],
+            "members-to-remind.txt",
+            ephemeral=True,
+        )
+        return
+
+    progress = {"total": len(to_remind), "notified": 0, "skipped": 0, "failed": 0, "verified": 0}
     notified = []
-    async for member in ctx.guild.fetch_members():
-        if len(member.roles) <= 1:
-            # Member will be notified
-            Log.info(
+
+    async def remind(member):
+        # Reminders queue behind each other, so skip anyone who verified or left in the meantime
+        if not refresh_unverified(member):
+            progress["verified"] += 1
+            return
+
+        # Member will be notified
+        Log.info(
+            f"Reminding member {member.name}[{member.id}] as they have one or fewer roles (@/everyone)"
+        )
+        if logs_channel:
+            await logs_channel.send(
                 f"Reminding member {member.name}[{member.id}] as they have one or fewer roles (@/everyone)"
             )
-            if logs_channel:
-                await logs_channel.send(
-                    f"Reminding member {member.name}[{member.id}] as they have one or fewer roles (@/everyone)"
-                )
 
-            # Get DM channel
-            dm_channel = await member.create_dm()
+        # Notify them through the outbox, which skips anyone reminded in the last day
+        result = await dm_outbox.enqueue(
+            member.id,
+            f"Hey there! It looks like you have not completed joining the {ctx.guild.name} Discord server. Please ensure that you click the green \"verify\" button to confirm that you are a resident. If you are experiencing issues verifying yourself, click [here](https://pitt.co1.qualtrics.com/jfe/form/SV_25Y15jZ9BmYYEf4) for help.",
+            dedup_key=f"assist:{ctx.guild.id}",
+            guild_id=ctx.guild.id,
+        )
+        if result == "sent" and not refresh_unverified(member):
+            # Verified while the reminder was waiting to be sent
+            progress["verified"] += 1
+        elif result == "sent":
+            progress["notified"] += 1
+            notified.append(member)
+        elif result == "duplicate":
+            progress["skipped"] += 1
+        else:
+            progress["failed"] += 1
 
-            # Notify them
-            if dm_channel:
-                try:
-                    await dm_channel.send(
-                        f"Hey there! It looks like you have not completed joining the {ctx.guild.name} Discord server. Please ensure that you click the green \"verify\" button to confirm that you are a resident. If you are experiencing issues verifying yourself, click [here](https://pitt.co1.qualtrics.com/jfe/form/SV_25Y15jZ9BmYYEf4) for help."
-                    )
-                except discord.Forbidden:
-                    Log.warning(
-                        f"Member {member.name}[{member.id}] does not allow DMs or creating a DM failed, could not remind them."
-                    )
-                    if logs_channel:
-                        await logs_channel.send(
-                            f"**WARNING**: Member {member.name}[{member.id}] does not allow DMs or creating a DM failed, could not remind them."
-                        )
-            else:
-                Log.warning(
-                    f"Member {member.name}[{member.id}] does not allow DMs or creating a DM failed, could not remind them."
-                )
-                if logs_channel:
-                    await logs_channel.send(
-                        f"**WARNING**: Member {member.name}[{member.id}] does not allow DMs or creating a DM failed, could not remind them."
-                    )
+    message = await ctx.send_followup(
+        embed=member_progress_embed("Reminding unverified members...", discord.Colour.blurple(), progress),
+        ephemeral=True,
+    )
+    await show_progress(
+        message,
+        asyncio.gather(*(remind(member) for member in to_remind)),
+        lambda: member_progress_embed("Reminding unverified members...", discord.Colour.blurple(), progress),
+    )
+    await message.edit(
+        embed=member_progress_embed("Finished reminding unverified members", discord.Colour.green(), progress)
+    )
 
-            num_notified += 1
-            notified.append(member)
+    # Respond with ephemeral list of members notified
+    header = f"**{progress['notified']} members were notified:**"
+    if progress["skipped"]:
+        header = f"**{progress['notified']} members were notified, {progress['skipped']} were already reminded today:**"
+    if progress["verified"]:
+        header = f"{header[:-3]} ({progress['verified']} verified or left first):**"
+    await send_report(
+        ctx,
+        header,
+        [f"{member} [{member.id}]" for member in notified],
+        "reminded-members.txt",
+        ephemeral=True,
+    )
 
-    # Respond with ephemeral list of members pruned
-    message_content = f"**{num_notified} members were notified:**\n"
 
-    for mem in notified:
-        message_content += f"{mem}\n"
+@bot.slash_command(
+    description="List the members that have not verified."
+)
+@discord.ext.commands.has_permissions(administrator=True)
+@discord.guild_only()
+async def list_unverified(ctx):
+    await ctx.defer(ephemeral=True)
 
-    # Reply with members pruned
-    await ctx.followup.send(content=message_content, ephemeral=True)
+    now = discord.utils.utcnow()
+    lines = []
+    for member in get_unverified(ctx.guild):
+        waiting = (now - member.joined_at).days if member.joined_at else "?"
+        lines.append(f"{member} [{member.id}], joined {waiting} days ago")
+
+    await send_report(
+        ctx,
+        f"**{len(lines)} members have not verified:**",
+        lines,
+        "unverified-members.txt",
+        ephemeral=True,
+    )
 
 
 @bot.slash_command(
@@ -1817,32 +3162,7 @@ async def faq(
 )
 @discord.ext.commands.has_permissions(administrator=True)
 async def add_forum(ctx):
-    category = discord.utils.get(ctx.guild.categories, name='building')
-    topic = """
-# Welcome to the forum!
-Here, you can ask any question you like and we will do our best to answer it!
-
-### Directions
-* Make a post with the question in the title
-* Add any additional information in the description
-* Add a relevant tag to your post
-* Post it!
-"""
-    
-    # Create ForumTag objects
-    tag_data = {
-        'general': '🔖',
-        'food': '🥕',
-        'entertainment': '🎉',
-        'housing': '🏠',
-        'transportation': '🚌',
-        'tech': '💻',
-        'classes': '📚',
-    }
-    tags = [discord.ForumTag(name=name, moderated=False, emoji=discord.PartialEmoji(name=emoji)) for name, emoji in tag_data.items()]
-
-    forum_channel = await ctx.guild.create_forum_channel('questions', category=category)
-    await forum_channel.edit(position=4, topic=topic, available_tags=tags)
+    await create_forum(ctx.guild)
 
     # Finished
     await ctx.respond("Task completed.", ephemeral=True)
@@ -1856,6 +3176,7 @@ Here, you can ask any question you like and we will do our best to answer it!
 async def ctx_reset_user(ctx, member: discord.Member):
     try:
         user_count = session.query(DbUser).filter_by(ID=member.id).delete()
+        user_to_email.pop(member.id, None)
     except:
         user_count = 0
         await ctx.respond(
@@ -1888,6 +3209,7 @@ async def ctx_reset_user(ctx, member: discord.Member):
 async def ctx_reset_user_drop(ctx, member: discord.Member):
     try:
         user_count = session.query(DbUser).filter_by(ID=member.id).delete()
+        user_to_email.pop(member.id, None)
     except:
         user_count = 0
         await ctx.respond(
@@ -1947,68 +3269,101 @@ async def ctx_reset_user_drop(ctx, member: discord.Member):
 @discord.ext.commands.has_permissions(administrator=True)
 async def assign(ctx, 
     role: discord.Option(discord.Role, "Role to assign"), 
-    emails: discord.Option(str, "Raw pastebin link of return separated emails to give the role to")
+    emails: discord.Option(str, "Raw pastebin link of return separated emails to give the role to", required=False, default=None),
+    email_file: discord.Option(discord.Attachment, "A .txt or .csv file with one email per line", required=False, default=None),
+    dry_run: discord.Option(bool, "Check the list without assigning any roles", required=False, default=False),
     ):
     # Defer a response to prevent the 3 second timeout gate from being closed.
     await ctx.defer()
 
-    # Check if the link is a raw link
-    if "raw" not in emails:
-        await ctx.send_followup(
-            "Uh oh! You need to send a `raw` link. Please make sure you are providing a raw text link.",
-            ephemeral=True,
-        )
-        return
-
-    # Fetch the raw text from the provided link
+    # Stream the attachment or raw text from the provided link, one email per line
+    emails_in_order = []
+    invalid_lines = []
     try:
-        response = requests.get(emails)
-        response.raise_for_status()
-    except requests.RequestException:
+        line_number = 0
+        async for line in util.rosters.read_lines(link=emails, attachment=email_file):
+            line_number += 1
+            try:
+                email = util.rosters.clean_email_line(line)
+            except ValueError as ex:
+                invalid_lines.append(f"Line {line_number}: {ex}")
+                continue
+            if email:
+                emails_in_order.append(email)
+    except util.rosters.RosterError as ex:
+        await ctx.send_followup(str(ex), ephemeral=True)
+        return
+    except FetchError:
         await ctx.send_followup(
             "The given link returned a failure status code when queried. Are you sure it's valid?",
             ephemeral=True,
         )
         return
 
-    email_list = response.text.split('\n')
-
-    # Initialize counters
-    success_count = 0
-    failed_emails = []
+    # Drop repeats, keeping the order of the list
+    emails_in_order = list(dict.fromkeys(emails_in_order))
 
-    # Iterate over the emails
-    for email in email_list:
-        # Remove leading and trailing whitespace
-        email = email.strip()
+    # Resolve every email to its users with a handful of indexed queries rather than one per line
+    email_to_user_ids = {}
+    for i in range(0, len(emails_in_order), ASSIGN_QUERY_CHUNK):
+        chunk = emails_in_order[i:i + ASSIGN_QUERY_CHUNK]
+        for user_id, email_key in session.query(DbUser.ID, DbUser.email_key).filter(
+            DbUser.email_key.in_(chunk)
+        ):
+            email_to_user_ids.setdefault(email_key, []).append(user_id)
 
-        # Query the database for a user with the current email
-        user = session.query(DbUser).filter(func.lower(DbUser.email) == email.lower()).first()
+    # Match users to members of this server
+    failed_emails = []
+    to_assign = []
+    success_count = 0
+    for email in emails_in_order:
+        members = [
+            member
+            for member in map(ctx.guild.get_member, email_to_user_ids.get(email, []))
+            if member
+        ]
+        if not email_to_user_ids.get(email):
+            failed_emails.append(f"{email}: no user has verified with this email")
+        elif not members:
+            failed_emails.append(f"{email}: not a member of this server")
+        else:
+            for member in members:
+                if role in member.roles:
+                    success_count += 1
+                else:
+                    to_assign.append((email, member))
 
-        # If a user was found
-        if user:
-            # Fetch the discord member
-            member = discord.utils.get(ctx.guild.members, id=user.ID)
+    if dry_run:
+        success_count += len(to_assign)
+    else:
+        limiter = asyncio.Semaphore(ASSIGN_CONCURRENCY)
 
-            # If the member was found
-            if member:
-                # Try to add the role to the member
+        async def add_role(email, member):
+            # The library waits out rate limits itself; the limiter keeps us from running into them
+            async with limiter:
                 try:
                     await member.add_roles(role, reason="Assigned by /assign command")
-                    success_count += 1
+                    return True
                 except discord.errors.Forbidden:
-                    failed_emails.append(email)
-            else:
-                failed_emails.append(email)
-        else:
-            failed_emails.append(email)
+                    failed_emails.append(f"{email}: missing permissions to add the role to {member}")
+                except discord.HTTPException as ex:
+                    failed_emails.append(f"{email}: adding the role to {member} failed ({ex.status})")
+                return False
+
+        results = await asyncio.gather(*(add_role(email, member) for email, member in to_assign))
+        success_count += results.count(True)
 
     # Send a report
-    if failed_emails:
-        failed_emails_str = "\n".join(failed_emails)
-        await ctx.respond(f"Successfully added role to {success_count} users. Failed to add role to the following emails:\n```{failed_emails_str}```")
+    verb = "Would add" if dry_run else "Successfully added"
+    if failed_emails or invalid_lines:
+        await send_report(
+            ctx,
+            f"{verb} role to {success_count} users. Failed to add role to the following emails:",
+            failed_emails + invalid_lines,
+            "failed-emails.txt",
+        )
     else:
-        await ctx.respond(f"Successfully added role to {success_count} users. All emails were processed successfully.")
+        await ctx.respond(f"{verb} role to {success_count} users. All emails were processed successfully.")
 
 
 # Broadcast command to send a notification
@@ -2019,7 +3374,8 @@ async def broadcast(
     interaction: discord.Interaction,
     message: discord.Option(str, "Message to broadcast"),
     ping_role: discord.Option(str, "Would you like to ping a role?", required=False),
-    image_url: discord.Option(str, "URL of image to attach", required=False)
+    image_url: discord.Option(str, "URL of image to attach", required=False),
+    delay_minutes: discord.Option(int, "Send the broadcast this many minutes from now", required=False, default=None, min_value=1),
 ):
     # Cancels the command with a warning message if the user is not an administrator
     if not interaction.user.guild_permissions.administrator:
@@ -2027,52 +3383,87 @@ async def broadcast(
         return
     # Replace "\n" with a newline character
     message = message.replace("\\n", "\n")
-    # Iterates through residence hall servers, skipping hub server
-    for guild in bot.guilds:
-        if guild.id == HUB_SERVER_ID:
-            continue
-        # Finds the @residents role
-        mention_string = ""
-        if ping_role:
-            for role in guild.roles:
-                if role.name == ping_role:
-                    mention_string = role.mention
-        # Finds the announcements channel and sends the message
-        for channel in guild.channels:
-            if channel.name == 'announcements':
-                if channel.category.name == 'info':
-                    if image_url:
-                        # Download the image
-                        image = urlopen(image_url).read()
-                        # Create a discord.File object
-                        file = File(fp=BytesIO(image), filename='image.png')
-                        await channel.send(content=message + "\n" + mention_string, file=file)
-                    else:
-                        await channel.send(content=message + "\n" + mention_string)
+
+    # Delayed broadcasts are handed to the scheduler, which survives restarts
+    if delay_minutes:
+        send_at = discord.utils.utcnow() + datetime.timedelta(minutes=delay_minutes)
+        job = scheduler.schedule(
+            "broadcast",
+            send_at,
+            payload={"message": message, "ping_role": ping_role, "image_url": image_url},
+        )
+        if job is None:
+            await interaction.response.send_message(
+                "The broadcast couldn't be scheduled, see the logs. Nothing was sent.", ephemeral=True
+            )
+            return
+        await interaction.response.send_message(
+            content=f"Broadcast scheduled for {discord.utils.format_dt(send_at)}.", delete_after=10
+        )
+        return
+
+    await interaction.response.defer()
+    try:
+        await send_broadcast(message, ping_role, image_url)
+    except util.images.ImageError as ex:
+        await interaction.followup.send(str(ex), ephemeral=True)
+        return
     # Sends confirmation message in #bot-commands
-    await interaction.response.send_message(content="Request completed.", delete_after=10)
+    await interaction.followup.send(content="Request completed.", delete_after=10)
 
 
 # Command to clear messages in a channel
-@bot.slash_command(name="purge", description="Deletes all messages in a channel up to 100 messages")
+@bot.slash_command(name="purge", description="Deletes messages in a channel, optionally filtered by author or date")
 @discord.guild_only()
 @discord.ext.commands.has_permissions(administrator=True)
 async def purge(
-    interaction: discord.Interaction
+    interaction: discord.Interaction,
+    author: discord.Option(discord.Member, "Only delete messages from this member", required=False, default=None),
+    before: discord.Option(str, "Only delete messages before this message ID/link or date (YYYY-MM-DD)", required=False, default=None),
+    after: discord.Option(str, "Only delete messages after this message ID/link or date (YYYY-MM-DD)", required=False, default=None),
+    limit: discord.Option(int, "Maximum number of messages to delete (default: all)", required=False, default=None, min_value=1),
 ):
     # Cancels the command with a warning message if the user is not an administrator
     if not interaction.user.guild_permissions.administrator:
         await interaction.response.send_message("Administrator permissions required to run this command.", ephemeral=True)
         return
-    await interaction.response.send_message(content="Deleting messages...", ephemeral=True, delete_after=5)
-    msgs = []
-    async for msg in interaction.channel.history(limit=100):
-        msgs.append(msg)
+
     try:
-        await interaction.channel.delete_messages(msgs)
-    except discord.errors.HTTPException:
-        async for msg in interaction.channel.history(limit=100):
-            await msg.delete()
+        before = util.purge.parse_bound(before) if before else None
+        after = util.purge.parse_bound(after) if after else None
+    except ValueError:
+        await interaction.response.send_message(
+            "`before` and `after` must be a message ID, a message link or a date like 2023-08-28.",
+            ephemeral=True,
+        )
+        return
+
+    await interaction.response.defer(ephemeral=True)
+
+    progress = {"scanned": 0, "deleted": 0, "failed": 0}
+
+    def purge_embed(title: str, colour: discord.Colour):
+        embed = discord.Embed(title=title, color=colour)
+        for field, value in progress.items():
+            embed.add_field(name=field.capitalize(), value=str(value))
+        return embed
+
+    started = datetime.datetime.now()
+    message = await interaction.followup.send(
+        embed=purge_embed(f"Purging #{interaction.channel.name}...", discord.Colour.blurple()),
+        ephemeral=True,
+    )
+    await show_progress(
+        message,
+        util.purge.purge_channel(
+            interaction.channel, author=author, before=before, after=after, limit=limit, progress=progress
+        ),
+        lambda: purge_embed(f"Purging #{interaction.channel.name}...", discord.Colour.blurple()),
+    )
+
+    elapsed = (datetime.datetime.now() - started).total_seconds()
+    colour = discord.Colour.green() if not progress["failed"] else discord.Colour.orange()
+    await message.edit(embed=purge_embed(f"Purged #{interaction.channel.name} in {elapsed:.1f}s", colour))
 
 
 # ------------------------------- EVENT HANDLERS -------------------------------
@@ -2120,6 +3511,7 @@ async def on_scheduled_event_create(scheduled_event):
         Log.info(f"Adding {scheduled_event.name} to database...")
         session.add(new_event)
         session.commit()
+        event_name_to_number[scheduled_event.name] = new_event.event_number
     except Exception as ex:
         session.rollback()
         Log.error(
@@ -2152,28 +3544,17 @@ async def on_scheduled_event_create(scheduled_event):
         if (cover_url.lower()).startswith("http"):
             # Deletes message with buttons to avoid double-clicking
             await interaction.delete_original_response()
-            # Opens URL and converts contents to bytes object
-            cover_bytes = urlopen(cover_url).read()
+            # Downloads the image, sized for an event cover, or reuses it from the cache
+            try:
+                cover_bytes = await util.images.load_cover(cover_url)
+            except util.images.ImageError as ex:
+                await bot_commands.send(f"**Error: Could not use image.**\n{ex} Try again.")
+                return
             # Adds cover image to hub event
             await scheduled_event.edit(cover=cover_bytes)
 
-            for guild in bot.guilds:
-                if guild.id == HUB_SERVER_ID:
-                    continue
-                # Creates cloned event without cover image
-                event_clone = await guild.create_scheduled_event(
-                    name=scheduled_event.name,
-                    description=scheduled_event.description,
-                    location=location,
-                    start_time=scheduled_event.start_time,
-                    end_time=scheduled_event.end_time,
-                )
-                # Adds cover image to cloned event
-                await event_clone.edit(cover=cover_bytes)
-
-            await bot_commands.send(
-                f"Event **{scheduled_event.name}** successfully created **with** cover image."
-            )
+            # Creates cloned events, each with the cover image, and reports how it went
+            await clone_event(scheduled_event, location, cover=cover_bytes)
 
             # Update the event record in the database
             db_event = session.query(DbEvent).filter(DbEvent.status != 'cancelled', DbEvent.event_name == scheduled_event.name).order_by(desc(DbEvent.created_at)).first()
@@ -2197,21 +3578,8 @@ async def on_scheduled_event_create(scheduled_event):
         # Deletes message with buttons to avoid double-clicking
         await interaction.delete_original_response()
 
-        for guild in bot.guilds:
-            if guild.id == HUB_SERVER_ID:
-                continue
-            # Creates cloned event
-            await guild.create_scheduled_event(
-                name=scheduled_event.name,
-                description=scheduled_event.description,
-                location=location,
-                start_time=scheduled_event.start_time,
-                end_time=scheduled_event.end_time,
-            )
-
-        await bot_commands.send(
-            f"Event **{scheduled_event.name}** successfully created **without** cover image."
-        )
+        # Creates cloned events and reports how it went
+        await clone_event(scheduled_event, location)
 
     # Executes if 'Cancel Event' button is clicked
     async def cancel_callback(interaction: discord.Interaction):
@@ -2236,9 +3604,6 @@ async def on_scheduled_event_create(scheduled_event):
 # Does NOT support editing event title or cover image
 @bot.event
 async def on_scheduled_event_update(old_scheduled_event, new_scheduled_event):
-    # Stores whether the event was manually started
-    event_start = False
-
     # Check the location type and set the location accordingly
     if new_scheduled_event.location.type.name != 'external':
         location = str(new_scheduled_event.location.type.name)
@@ -2248,6 +3613,8 @@ async def on_scheduled_event_update(old_scheduled_event, new_scheduled_event):
     # Update the event record in the database
     db_event = session.query(DbEvent).filter(DbEvent.status != 'cancelled', DbEvent.event_name == old_scheduled_event.name).order_by(desc(DbEvent.created_at)).first()
     if db_event is not None:
+        event_name_to_number.pop(old_scheduled_event.name, None)
+        event_name_to_number.pop(new_scheduled_event.name, None)
         db_event.event_name = new_scheduled_event.name
         db_event.location = location
         db_event.start_time = new_scheduled_event.start_time
@@ -2264,69 +3631,49 @@ async def on_scheduled_event_update(old_scheduled_event, new_scheduled_event):
     if (new_scheduled_event.guild).id != HUB_SERVER_ID:
         return
 
-    # Iterates through the residence hall servers, skipping the hub server
-    for guild in bot.guilds:
-        if guild.id == HUB_SERVER_ID:
-            continue
-        # Iterates through the events in the server
-        for scheduled_event in guild.scheduled_events:
-            # Executes each time an event with the old name is found
-            if scheduled_event.name == old_scheduled_event.name:
-                await scheduled_event.edit(
-                    name=new_scheduled_event.name,
-                    description=new_scheduled_event.description,
-                    location=location,
-                    start_time=new_scheduled_event.start_time,
-                    end_time=new_scheduled_event.end_time,
-                    )
-            # Executes each time an event with the same name is found
-            if scheduled_event.name == new_scheduled_event.name:
-                # Syncs edits to scheduled events
-                if new_scheduled_event.status.name == "scheduled":
-                    if scheduled_event.status.name == "scheduled":
-                        # Edits the event to match the one on the hub server
-                        await scheduled_event.edit(
-                            description=new_scheduled_event.description,
-                            location=location,
-                            start_time=new_scheduled_event.start_time,
-                            end_time=new_scheduled_event.end_time,
-                        )
-                # Syncs manual starts and edits to active events
-                elif new_scheduled_event.status.name == "active":
-                    if scheduled_event.status.name == "scheduled":
-                        # Starts the event
-                        await scheduled_event.start()
-                        event_start = True
-                    elif scheduled_event.status.name == "active":
-                        # Edits the event to match the one on the hub server
-                        await scheduled_event.edit(
-                            description=new_scheduled_event.description,
-                            location=location,
-                            end_time=new_scheduled_event.end_time,
-                        )
+    # Ignores updates that don't touch anything the clones copy, such as the interested count
+    # Locations are compared by what gets synced, since ScheduledEventLocation has no __eq__
+    synced_fields = ("name", "description", "start_time", "end_time", "status")
+    if event_location(old_scheduled_event) == event_location(new_scheduled_event) and all(
+        getattr(old_scheduled_event, field) == getattr(new_scheduled_event, field) for field in synced_fields
+    ):
+        return
+
+    hub_status = new_scheduled_event.status.name
+    started = []
+
+    def sync(scheduled_event):
+        operation = clone_sync_operation(new_scheduled_event, scheduled_event)
+        if operation is None:
+            return None
+        kind, call = operation
+        if kind == "start":
+            started.append(scheduled_event)
+        return call()
+
+    _, failures = await sync_event_clones(new_scheduled_event.id, sync)
+
+    # Move the reminder with the event, or drop it once the event has started
+    schedule_event_reminder(new_scheduled_event)
+
+    # Completed events can't change again
+    if hub_status == "completed":
+        hub_event_to_clones.pop(new_scheduled_event.id, None)
+
     # Sends an appropriate confirmation in #bot-commands depending on what was updated
     bot_commands = bot.get_channel(BOT_COMMANDS_ID)
-    if event_start == True:
+    failure_note = f" Failed in {len(failures)} servers, see the logs." if failures else ""
+    if started:
         await bot_commands.send(
-            f"Event **{new_scheduled_event.name}** successfully started."
+            f"Event **{new_scheduled_event.name}** successfully started.{failure_note}"
         )
-    elif (new_scheduled_event.status.name == "scheduled") or (
-        new_scheduled_event.status.name == "active"
-    ):
+    elif hub_status in ("scheduled", "active"):
         await bot_commands.send(
-            f"Event **{new_scheduled_event.name}** successfully updated."
+            f"Event **{new_scheduled_event.name}** successfully updated.{failure_note}"
         )
-    # Syncs manual completion of active events in addition to sending a confirmation message
-    elif new_scheduled_event.status.name == "completed":
-        for guild in bot.guilds:
-            if guild.id == HUB_SERVER_ID:
-                continue
-            for scheduled_event in guild.scheduled_events:
-                if scheduled_event.name == new_scheduled_event.name:
-                    if scheduled_event.status.name == "active":
-                        await scheduled_event.complete()
+    elif hub_status == "completed":
         await bot_commands.send(
-            f"Event **{new_scheduled_event.name}** successfully completed."
+            f"Event **{new_scheduled_event.name}** successfully completed.{failure_note}"
         )
 
 
@@ -2337,6 +3684,7 @@ async def on_scheduled_event_delete(deleted_event):
     # Update the event record in the database
     db_event = session.query(DbEvent).filter(DbEvent.status != 'cancelled', DbEvent.event_name == deleted_event.name).order_by(desc(DbEvent.created_at)).first()
     if db_event is not None:
+        event_name_to_number.pop(deleted_event.name, None)
         db_event.status = deleted_event.status.name
     try:
         Log.info(f"Updating {deleted_event.name} in database to cancelled...")
@@ -2348,106 +3696,147 @@ async def on_scheduled_event_delete(deleted_event):
     # Ignores cancellations not initiated on residence hall servers
     if (deleted_event.guild).id != HUB_SERVER_ID:
         return
-    # Iterates through residence hall servers, skipping hub server
-    for guild in bot.guilds:
-        if guild.id == HUB_SERVER_ID:
-            continue
-        # Iterates through events in the server
-        for scheduled_event in guild.scheduled_events:
-            # Executes each time an event with the same name is found
-            if scheduled_event.name == deleted_event.name:
-                if scheduled_event.status.name == "scheduled":
-                    await scheduled_event.cancel()
+    # Cancels every clone that hasn't started yet
+    _, failures = await sync_event_clones(
+        deleted_event.id,
+        lambda scheduled_event: scheduled_event.cancel() if scheduled_event.status.name == "scheduled" else None,
+    )
+    hub_event_to_clones.pop(deleted_event.id, None)
+    scheduler.cancel(f"event_reminder:{deleted_event.id}")
+
     # Sends confirmation message in #bot-commands
     bot_commands = bot.get_channel(BOT_COMMANDS_ID)
-    await bot_commands.send(f"Event **{deleted_event.name}** successfully canceled.")
+    failure_note = f" Failed in {len(failures)} servers, see the logs." if failures else ""
+    await bot_commands.send(f"Event **{deleted_event.name}** successfully canceled.{failure_note}")
 
 
-# Announces cumulative events once per week on Monday at 8AM
-# Runs once every day at 8AM and cancels on non-Mondays
-@tasks.loop(time=datetime.time(hour=13))
-async def weekly_cumulative_event_announcement():
-    # Cancels the function if today's date isn't Monday
-    if datetime.date.today().weekday() != 0:
+# Brings event clones back in line with the hub, in case an update was missed
+# while the bot was down or a sync call failed
+@tasks.loop(minutes=EVENT_RECONCILE_MINUTES)
+async def reconcile_event_clones():
+    hub = bot.get_guild(HUB_SERVER_ID)
+    if not hub:
         return
-    # Iterates through residence hall servers, skipping hub server
+
+    hub_events = {event.id: event for event in hub.scheduled_events}
+    live_names = {event.name for event in hub_events.values()}
+    operations = []
+
+    # Diff every server's clones against the hub in one pass
     for guild in bot.guilds:
         if guild.id == HUB_SERVER_ID:
-            continue 
-        # Delete old announcements
-        for channel in guild.channels:
-            if channel.name == 'announcements':
-                if channel.category.name == 'info':
-                    async for msg in channel.history():
-                        if msg.author == bot.user and "Check out what's happening this week!" in msg.content:
-                            await msg.delete()
-        # Finds the @residents role
-        mention_string = ""
-        for role in guild.roles:
-            if role.name == 'residents':
-                mention_string = f"Check out what's happening this week! Make sure to click the \"interested\" button if you would like to be reminded when that event starts.\n||{role.mention} "
-        # Sends the embed for each event
-        message = f""
-        event_count = 0
-        events = []
-        for scheduled_event in guild.scheduled_events:
-            def within_week(x):
-                try:
-                    d = datetime.datetime.strptime(x, "%Y-%m-%d %H:%M:%S")
-                except ValueError:
-                    d = datetime.datetime.strptime(x, "%Y-%m-%d %H:%M:%S.%f") # Sometimes there are microseconds
-                now = datetime.datetime.now()
-                return (d - now).days < 7 # Check if the events are within a week
-            if scheduled_event.status.name == "scheduled" and within_week(str(scheduled_event.start_time.replace(tzinfo=None))):
-                event_count += 1
-                events.append(f"[-]({scheduled_event.url}) ")
-        # Finds the announcements channel and sends the embed message
-        message = message.join(events)        
-        if event_count > 0:
-            for channel in guild.channels:
-                if channel.name == 'announcements':
-                    if channel.category.name == 'info':
-                        await channel.send(content=mention_string+f"{message}||") # Send the announcement
+            continue
+        cloned = set()
+        for hub_event in hub_events.values():
+            clone_id = hub_event_to_clones.get(hub_event.id, {}).get(guild.id)
+            clone = guild.get_scheduled_event(clone_id) if clone_id else None
+            if clone:
+                cloned.add(clone.id)
+                operation = clone_sync_operation(hub_event, clone)
+                if operation:
+                    operations.append((guild, hub_event, *operation))
+            # Only events that were published once; the rest are still waiting on their cover prompt
+            elif hub_event.status.name == "scheduled" and hub_event.id in hub_event_to_clones:
+                operations.append((guild, hub_event, "create", None))
+
+        # Clones whose hub event was cancelled or completed while nobody was listening
+        for event in guild.scheduled_events:
+            if event.id in cloned or int(event.creator_id or 0) != bot.user.id or event.name in live_names:
+                continue
+            if event.status.name == "scheduled":
+                operations.append((guild, event, "cancel", event.cancel))
+            elif event.status.name == "active":
+                operations.append((guild, event, "complete", event.complete))
+
+    if not operations:
+        return
+
+    covers = {}
+    for _, hub_event, kind, _ in operations:
+        if kind == "create" and hub_event.cover and hub_event.id not in covers:
+            try:
+                covers[hub_event.id] = await util.images.load_cover(hub_event.cover.url)
+            except util.images.ImageError:
+                # Clone without a cover rather than not at all
+                covers[hub_event.id] = None
+
+    limiter = asyncio.Semaphore(EVENT_CLONE_CONCURRENCY)
+    failures = []
+
+    async def apply(guild, event, kind, call):
+        async with limiter:
+            try:
+                if kind == "create":
+                    event_clone = await util.events.create_clone(
+                        guild, event, event_location(event), covers.get(event.id)
+                    )
+                    hub_event_to_clones.setdefault(event.id, {})[guild.id] = event_clone.id
+                else:
+                    await call()
+            except Exception as ex:
+                Log.error(f"Reconciling event {event.name} in {guild.name}[{guild.id}] ({kind}) failed: {ex}")
+                failures.append(f"{guild.name}: {kind} {event.name} ({ex})")
+
+    started = datetime.datetime.now()
+    await asyncio.gather(*(apply(*operation) for operation in operations))
+    elapsed = (datetime.datetime.now() - started).total_seconds()
+
+    counts = {}
+    for _, _, kind, _ in operations:
+        counts[kind] = counts.get(kind, 0) + 1
+    summary = ", ".join(f"{count} {kind}" for kind, count in counts.items())
+    Log.ok(f"Reconciled event clones in {elapsed:.1f}s: {summary}")
+
+    bot_commands = bot.get_channel(BOT_COMMANDS_ID)
+    if bot_commands:
+        message = f"Event clones had drifted from the hub and were reconciled: {summary}."
+        if failures:
+            message += f"\n**{len(failures)} failed:**\n" + "\n".join(failures)
+        await bot_commands.send(message[:2000])
+
+
+# Announces cumulative events once per week on Monday at 8AM
+# Run by the scheduler, see schedule_weekly_announcement
+async def weekly_cumulative_event_announcement(payload: dict):
+    await post_weekly_announcements()
 
 
 # Handle when user subscribes to an event
 @bot.event
 async def on_raw_scheduled_event_user_add(payload):
-    # Fetch the event details
-    guild = payload.guild
-    event = await guild.fetch_scheduled_event(payload.event_id)
-
     # Ignore subscriptions in hub server
+    guild = payload.guild
     if guild.id == HUB_SERVER_ID:
         return
-    
+
+    # Get the event details from the cache, only asking Discord if it isn't there
+    event = guild.get_scheduled_event(payload.event_id) or await guild.fetch_scheduled_event(payload.event_id)
+
     # Ignore subscriptions by event creator
     if payload.user_id == int(event.creator_id):
         return
-    
-    # Find the event in the database
-    db_event = session.query(DbEvent).filter(DbEvent.status != 'cancelled', DbEvent.event_name == event.name).order_by(desc(DbEvent.created_at)).first()
 
-    if db_event is not None:
-        # Fetch the user's details from the database
-        db_user = session.query(DbUser).filter_by(ID=payload.user_id).first()
+    # Find the event in the database
+    event_number = get_event_number(event.name)
 
-        # If the user's details are found, use them. Otherwise, use None.
-        user = await bot.get_or_fetch_user(payload.user_id)
-        user_email = db_user.email if db_user is not None else None
+    if event_number is not None:
+        # Members are cached, so this only asks Discord about users who already left
+        user = guild.get_member(payload.user_id) or await bot.get_or_fetch_user(payload.user_id)
 
-        # Create a new subscriber record in the database
+        # Create a new subscriber record in the database, and count it, in a single commit
         new_subscriber = DbSubscriber(
             user_id=payload.user_id,
             user_name=user.name,
-            user_email=user_email,
-            event_number=db_event.event_number
+            user_email=get_user_email(payload.user_id),
+            event_number=event_number
             )
 
         try:
-            Log.info(f"Adding {user.name} to database - user subscribed to {db_event.event_name}...")
+            Log.info(f"Adding {user.name} to database - user subscribed to {event.name}...")
             session.add(new_subscriber)
-            db_event.subscribers += 1
+            session.query(DbEvent).filter_by(event_number=event_number).update(
+                {DbEvent.subscribers: DbEvent.subscribers + 1}, synchronize_session=False
+            )
             session.commit()
         except Exception as ex:
             session.rollback()
@@ -2456,27 +3845,32 @@ async def on_raw_scheduled_event_user_add(payload):
 # Handle when user unsubscribes from an event
 @bot.event
 async def on_raw_scheduled_event_user_remove(payload):
-    # Fetch the event details
-    guild = payload.guild
-    event = await guild.fetch_scheduled_event(payload.event_id)
-
     # Ignore subscriptions in hub server
+    guild = payload.guild
     if guild.id == HUB_SERVER_ID:
         return
 
+    # Get the event details from the cache, only asking Discord if it isn't there
+    event = guild.get_scheduled_event(payload.event_id) or await guild.fetch_scheduled_event(payload.event_id)
+
     # Ignore subscriptions by event creator
     if payload.user_id == int(event.creator_id):
         return
-    
-    # Find the event and subscriber in the database
-    db_event = session.query(DbEvent).filter(DbEvent.status != 'cancelled', DbEvent.event_name == event.name).order_by(desc(DbEvent.created_at)).first()
-    db_subscriber = session.query(DbSubscriber).filter_by(user_id=payload.user_id, event_number=db_event.event_number).first()
 
-    if db_event is not None and db_subscriber is not None:
+    # Find the event in the database
+    event_number = get_event_number(event.name)
+
+    if event_number is not None:
         try:
-            Log.info(f"Removing {db_subscriber.user_name} from database - user unsubscribed from {db_event.event_name}...")
-            session.delete(db_subscriber)
-            db_event.subscribers -= 1
+            # Delete the subscriber record and uncount it without reading either first
+            removed = session.query(DbSubscriber).filter_by(
+                user_id=payload.user_id, event_number=event_number
+            ).delete(synchronize_session=False)
+            if removed:
+                Log.info(f"Removing user {payload.user_id} from database - user unsubscribed from {event.name}...")
+                session.query(DbEvent).filter_by(event_number=event_number).update(
+                    {DbEvent.subscribers: DbEvent.subscribers - removed}, synchronize_session=False
+                )
             session.commit()
         except Exception as ex:
             session.rollback()
@@ -2494,45 +3888,9 @@ async def weeklytest(
     if not interaction.user.guild_permissions.administrator:
         await interaction.response.send_message("Administrator permissions required to run this command.", ephemeral=True)
         return
-    # Iterates through residence hall servers, skipping hub server
-    for guild in bot.guilds:
-        if guild.id == HUB_SERVER_ID:
-            continue 
-        # Delete old announcements
-        for channel in guild.channels:
-            if channel.name == 'announcements':
-                if channel.category.name == 'info':
-                    async for msg in channel.history():
-                        if msg.author == bot.user and "Check out what's happening this week!" in msg.content:
-                            await msg.delete()
-        # Finds the @residents role
-        mention_string = ""
-        for role in guild.roles:
-            if role.name == 'residents':
-                mention_string = f"Check out what's happening this week! Make sure to click the \"interested\" button if you would like to be reminded when that event starts.\n||{role.mention} "
-        # Creates an embed and iteratively appends fields for each event
-        message = f""
-        event_count = 0
-        events = []
-        for scheduled_event in guild.scheduled_events:
-            def within_week(x):
-                try:
-                    d = datetime.datetime.strptime(x, "%Y-%m-%d %H:%M:%S")
-                except ValueError:
-                    d = datetime.datetime.strptime(x, "%Y-%m-%d %H:%M:%S.%f") # Sometimes there are microseconds
-                now = datetime.datetime.now()
-                return (d - now).days < 7 # Check if the events are within a week
-            if scheduled_event.status.name == "scheduled" and within_week(str(scheduled_event.start_time.replace(tzinfo=None))):
-                event_count += 1
-                events.append(f"[.]({scheduled_event.url}) ")
-        # Finds the announcements channel and sends the embed message
-        message = message.join(events)        
-        if event_count > 0:
-            for channel in guild.channels:
-                if channel.name == 'announcements':
-                    if channel.category.name == 'info':
-                        await channel.send(content=mention_string+f"{message}||") # Send the announcement
-    await interaction.response.send_message(content="Request completed.")
+    await interaction.response.defer()
+    await post_weekly_announcements()
+    await interaction.followup.send(content="Request completed.")
 
 
 # ------------------------------- INVITE HANDLERS -------------------------------
@@ -2544,12 +3902,22 @@ async def on_member_join(member: discord.Member):
 
     Log.info(f"Member join event fired with {member.display_name}")
 
+    # Joins that arrive while the bot is starting up wait for the guild's caches
+    if not await wait_for_guild(member.guild.id, timeout=JOIN_READY_TIMEOUT):
+        Log.warning(
+            f"{member.guild.name}[{member.guild.id}] still isn't warmed up, handling {member.name}[{member.id}]'s join anyway"
+        )
+        invites_cache.setdefault(member.guild.id, [])
+
     # I'm thinking we should initiate verification here instead of
     # adding the roles, then the verify command does all of this code.
 
     # User is verifying for the guild they just joined
     user_to_guild[member.id] = member.guild
 
+    # Nobody has roles on arrival, so they start out unverified
+    track_unverified(member)
+
     # Get logs channel for errors
     logs_channel = discord.utils.get(member.guild.channels, name="logs")
 
@@ -2565,9 +3933,6 @@ async def on_member_join(member: discord.Member):
     # Invites before user joined
     old_invites = invites_cache[member.guild.id]
 
-    # Will need to DM member at some point
-    dm_channel = await member.create_dm()
-
     # This is a kind of janky method taken from this medium article:
     # https://medium.com/@tonite/finding-the-invite-code-a-user-used-to-join-your-discord-server-using-discord-py-5e3734b8f21f
 
@@ -2674,6 +4039,8 @@ async def on_member_join(member: discord.Member):
             choices=options, opts_to_inv=options_to_inv, timeout=180
         )
 
+        # Views can't be persisted, so this DM is sent directly rather than through the outbox
+        dm_channel = await member.create_dm()
         await dm_channel.send(
             content="For security, we must verify which community you belong to. Please select your community below!",
             view=view,
@@ -2726,6 +4093,18 @@ async def on_member_join(member: discord.Member):
         )
 
 
+@bot.event
+async def on_member_update(before: discord.Member, after: discord.Member):
+    # Keep the unverified index in step with role changes, e.g. verification
+    if before.roles != after.roles:
+        track_unverified(after)
+
+
+@bot.event
+async def on_member_remove(member: discord.Member):
+    guild_to_unverified.get(member.guild.id, set()).discard(member.id)
+
+
 @bot.event
 async def on_guild_join(guild):
     # Automate call of setup
@@ -2733,8 +4112,19 @@ async def on_guild_join(guild):
     # Track the landing channel (verify) of the server
     guild_to_landing[guild.id] = discord.utils.get(guild.channels, name="verify")
 
-    # Cache the invites for the guild as they currently stand (none should be present)
-    invites_cache[guild.id] = await guild.invites()
+    try:
+        # Cache the invites for the guild as they currently stand (none should be present)
+        try:
+            invites_cache[guild.id] = await guild.invites()
+        except discord.errors.Forbidden:
+            invites_cache[guild.id] = []
+            Log.warning(f"Can't read invites in {guild.name}[{guild.id}], invite tracking is disabled there")
+
+        # Start tracking the members that have yet to verify
+        index_unverified(guild)
+    finally:
+        # Joins wait on this, so it must be set even if the invites couldn't be read
+        get_guild_ready(guild.id).set()
 
     ra_role = discord.utils.get(guild.roles, name="RA")
 
@@ -2770,15 +4160,8 @@ async def on_guild_join(guild):
         )
         Log.error(f"An error occurred: {ex}\n{traceback.format_exc()}")
 
-    # Create a view that will contain a button which can be used to initialize the verification process
-    view = VerifyView()
-
     # Finished
-    # Delete old verification message
-    async for msg in guild_to_landing[guild.id].history():
-        if msg.author == bot.user:
-            await msg.delete()
-    await guild_to_landing[guild.id].send(content=VERIFICATION_MESSAGE, view=view)
+    await post_verification_message(guild)
 
 
 @bot.event
@@ -2983,46 +4366,42 @@ async def on_application_command_error(
 
 @bot.event
 async def on_ready():
-    # Start the loop of weekly cumulative event announcements
-    weekly_cumulative_event_announcement.start()
-
-    # Build a default invite cache
-    for guild in bot.guilds:
-        try:
-            invites_cache[guild.id] = await guild.invites()
-            for invite in invites_cache[guild.id]:
-                try:
-                    invite_obj = (
-                        session.query(DbInvite).filter_by(code=invite.code).one()
-                    )
-                except:
-                    continue
-                else:
-                    if invite_obj:
-                        invite_to_role[invite.code] = discord.utils.get(
-                            guild.roles, id=invite_obj.role_id
-                        )
+    # Start running scheduled jobs, including any left pending before a restart
+    scheduler.register("weekly_announcement", weekly_cumulative_event_announcement)
+    scheduler.register("event_reminder", announce_event_starting)
+    scheduler.register("broadcast", send_scheduled_broadcast)
+    scheduler.start()
+    schedule_weekly_announcement()
+
+    # Start delivering direct messages, including any left over from before a restart
+    await dm_outbox.start()
+
+    # Handle presses of verify buttons posted before this restart
+    bot.add_view(VerifyView())
+
+    # Guilds whose verification prompt is already posted
+    prompted_guilds = {
+        row.guild_id for row in session.query(DbBotMessage.guild_id).filter_by(kind="verify")
+    }
 
-        except discord.errors.Forbidden:
-            continue
+    # Warm up every guild at once; joins and verifications in a guild wait until it's done
+    started = datetime.datetime.now()
+    timings = await asyncio.gather(*(warm_up_guild(guild, prompted_guilds) for guild in bot.guilds))
+    elapsed = (datetime.datetime.now() - started).total_seconds()
 
-        # A little bit of a hack that prevents us from needing a database for guilds yet
-        guild_to_landing[guild.id] = discord.utils.get(guild.channels, name="verify")
+    Log.info(f"Warmed up {len(bot.guilds)} guilds in {elapsed:.2f}s")
+    for guild, guild_timings in sorted(
+        zip(bot.guilds, timings), key=lambda pair: sum(pair[1].values()), reverse=True
+    ):
+        breakdown = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in guild_timings.items())
+        Log.info(f"    {guild.name}[{guild.id}]: {breakdown}")
 
-        # Create a view that will contain a button which can be used to initialize the verification process
-        view = VerifyView()
+    # Match hub events to their clones once, so event updates don't have to search for them
+    index_event_clones()
 
-        # Finished
-        try:
-            # Delete old verification message
-            async for msg in guild_to_landing[guild.id].history():
-                if msg.author == bot.user:
-                    await msg.delete()
-            await guild_to_landing[guild.id].send(
-                content=VERIFICATION_MESSAGE, view=view
-            )
-        except AttributeError:
-            continue
+    # Start checking that clones haven't drifted from the hub
+    if not reconcile_event_clones.is_running():
+        reconcile_event_clones.start()
 
     # Load categories cache from database
     for category_obj in session.query(DbCategory).all():
@@ -3041,4 +4420,6 @@ if DEBUG:
 """
     )
 
-bot.run(TOKEN)
+# Guarded so that tooling (e.g. util.loadtest) can import the bot without logging in.
+if __name__ == "__main__":
+    bot.run(TOKEN)
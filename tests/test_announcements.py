@@ -0,0 +1,69 @@
+"""Tests for util.announcements."""
+
+import datetime
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip("discord")
+
+from util.announcements import ANNOUNCEMENT_WINDOW, events_this_week
+
+NOW = datetime.datetime(2024, 9, 2, 16, 0, tzinfo=datetime.timezone.utc)
+
+
+def make_event(name: str, start_time: datetime.datetime, status: str = "scheduled"):
+    return SimpleNamespace(name=name, start_time=start_time, status=SimpleNamespace(name=status))
+
+
+def names(events):
+    return [event.name for event in events]
+
+
+def test_window_is_a_week():
+    assert ANNOUNCEMENT_WINDOW == datetime.timedelta(days=7)
+
+
+def test_event_at_end_of_window_is_excluded():
+    events = [make_event("next week", NOW + datetime.timedelta(days=7))]
+
+    assert events_this_week(events, NOW) == []
+
+
+def test_event_just_before_end_of_window_is_included():
+    events = [make_event("last minute", NOW + datetime.timedelta(days=7) - datetime.timedelta(seconds=1))]
+
+    assert names(events_this_week(events, NOW)) == ["last minute"]
+
+
+def test_past_scheduled_event_is_included():
+    events = [make_event("not started yet", NOW - datetime.timedelta(hours=2))]
+
+    assert names(events_this_week(events, NOW)) == ["not started yet"]
+
+
+@pytest.mark.parametrize("status", ["active", "completed", "canceled"])
+def test_only_scheduled_events_are_included(status):
+    events = [make_event(status, NOW + datetime.timedelta(days=1), status=status)]
+
+    assert events_this_week(events, NOW) == []
+
+
+def test_events_are_sorted_by_start_time():
+    events = [
+        make_event("friday", NOW + datetime.timedelta(days=4)),
+        make_event("earlier today", NOW - datetime.timedelta(hours=1)),
+        make_event("tuesday", NOW + datetime.timedelta(days=1)),
+        make_event("next monday", NOW + datetime.timedelta(days=7)),
+    ]
+
+    assert names(events_this_week(events, NOW)) == ["earlier today", "tuesday", "friday"]
+
+
+def test_timezone_of_now_does_not_matter():
+    eastern = datetime.timezone(datetime.timedelta(hours=-4))
+    events = [
+        make_event("inside", NOW + datetime.timedelta(days=6, hours=23)),
+        make_event("outside", NOW + datetime.timedelta(days=7, minutes=1)),
+    ]
+
+    assert names(events_this_week(events, NOW.astimezone(eastern))) == ["inside"]
@@ -0,0 +1,60 @@
+"""Tests for util.events."""
+
+import asyncio
+import datetime
+from types import SimpleNamespace
+import pytest
+
+discord = pytest.importorskip("discord")
+
+from util.events import create_clone
+
+START = datetime.datetime(2024, 9, 6, 22, 0, tzinfo=datetime.timezone.utc)
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(16)
+
+
+class FakeGuild:
+    """Records the events created in it, encoding the image the way py-cord does."""
+
+    def __init__(self):
+        self.created = []
+
+    async def create_scheduled_event(self, *, image=discord.utils.MISSING, **fields):
+        if image is not discord.utils.MISSING:
+            fields["image"] = discord.utils._bytes_to_base64_data(image)
+        self.created.append(fields)
+        return SimpleNamespace(id=len(self.created), **fields)
+
+
+def make_hub_event():
+    return SimpleNamespace(
+        name="Movie night",
+        description="Popcorn provided",
+        start_time=START,
+        end_time=START + datetime.timedelta(hours=2),
+    )
+
+
+def test_clone_without_cover():
+    guild = FakeGuild()
+
+    clone = asyncio.run(create_clone(guild, make_hub_event(), "Lothrop Hall"))
+
+    assert clone.name == "Movie night"
+    assert guild.created == [
+        {
+            "name": "Movie night",
+            "description": "Popcorn provided",
+            "location": "Lothrop Hall",
+            "start_time": START,
+            "end_time": START + datetime.timedelta(hours=2),
+        }
+    ]
+
+
+def test_clone_with_cover():
+    guild = FakeGuild()
+
+    asyncio.run(create_clone(guild, make_hub_event(), "Lothrop Hall", cover=PNG))
+
+    assert guild.created[0]["image"].startswith("data:image/png;base64,")
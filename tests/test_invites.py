@@ -0,0 +1,70 @@
+"""Tests for util.invites."""
+
+import asyncio
+import pytest
+
+discord = pytest.importorskip("discord")
+
+from util.invites import shared_category_overwrites
+
+
+class FakeCategory:
+    """Stands in for a category, applying set_permissions the way discord does."""
+
+    def __init__(self, overwrites: dict):
+        self.overwrites = dict(overwrites)
+
+    async def set_permissions(self, target, **permissions):
+        # Without an explicit overwrite, discord replaces the target's overwrite with one built from the keywords
+        self.overwrites[target] = discord.PermissionOverwrite(**permissions)
+
+
+def make_category():
+    everyone = discord.Object(id=1)
+    moderators = discord.Object(id=2)
+    existing_community = discord.Object(id=10)
+    return FakeCategory(
+        {
+            everyone: discord.PermissionOverwrite(read_messages=False),
+            moderators: discord.PermissionOverwrite(read_messages=True, manage_messages=True),
+            # Already let in by an earlier run, with an extra permission that set_permissions would drop
+            existing_community: discord.PermissionOverwrite(read_messages=True, send_messages=False),
+        }
+    )
+
+
+def apply_one_by_one(category: FakeCategory, roles: list):
+    async def apply():
+        for role in roles:
+            await category.set_permissions(role, read_messages=True, view_channel=True)
+
+    asyncio.run(apply())
+    return category.overwrites
+
+
+def overwrite_set(overwrites: dict):
+    return {target.id: overwrite.pair() for target, overwrite in overwrites.items()}
+
+
+def test_matches_repeated_set_permissions():
+    roles = [discord.Object(id=10), discord.Object(id=11), discord.Object(id=12)]
+
+    expected = apply_one_by_one(make_category(), roles)
+    result = shared_category_overwrites(make_category(), roles)
+
+    assert overwrite_set(result) == overwrite_set(expected)
+
+
+def test_no_roles_keeps_existing_overwrites():
+    category = make_category()
+
+    assert overwrite_set(shared_category_overwrites(category, [])) == overwrite_set(category.overwrites)
+
+
+def test_does_not_modify_category():
+    category = make_category()
+    before = overwrite_set(category.overwrites)
+
+    shared_category_overwrites(category, [discord.Object(id=11)])
+
+    assert overwrite_set(category.overwrites) == before
@@ -0,0 +1,87 @@
+"""Tests for util.scheduler."""
+
+import asyncio
+import datetime
+import pytest
+
+pytest.importorskip("orjson")
+pytest.importorskip("termcolor")
+sqlalchemy = pytest.importorskip("sqlalchemy")
+
+from sqlalchemy.orm import sessionmaker
+from util.db import Base, DbScheduledJob
+from util.scheduler import Scheduler, utcnow
+
+
+@pytest.fixture
+def session():
+    engine = sqlalchemy.create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def run_scheduler(session, setup, duration: float = 0.2):
+    """Start a scheduler, let `setup` schedule jobs on it, and return the payloads it ran."""
+    ran = []
+
+    async def main():
+        scheduler = Scheduler(session)
+
+        async def handler(payload):
+            ran.append(payload)
+
+        scheduler.register("test", handler)
+        scheduler.start()
+        setup(scheduler)
+        await asyncio.sleep(duration)
+        scheduler.runner.cancel()
+
+    asyncio.run(main())
+    return ran
+
+
+def test_due_job_runs_once(session):
+    def setup(scheduler):
+        scheduler.schedule("test", utcnow(), {"n": 1})
+
+    assert run_scheduler(session, setup) == [{"n": 1}]
+    assert session.query(DbScheduledJob).one().status == "done"
+
+
+def test_rescheduling_at_same_time_runs_once(session):
+    def setup(scheduler):
+        when = utcnow()
+        scheduler.schedule("test", when, {"n": 1}, key="k")
+        scheduler.schedule("test", when, {"n": 2}, key="k")
+
+    assert run_scheduler(session, setup) == [{"n": 2}]
+    assert session.query(DbScheduledJob).count() == 1
+
+
+def test_rescheduling_moves_job(session):
+    def setup(scheduler):
+        scheduler.schedule("test", utcnow() + datetime.timedelta(hours=1), {"n": 1}, key="k")
+        scheduler.schedule("test", utcnow(), {"n": 2}, key="k")
+
+    assert run_scheduler(session, setup) == [{"n": 2}]
+
+
+def test_cancelled_job_does_not_run(session):
+    def setup(scheduler):
+        scheduler.schedule("test", utcnow(), key="k")
+        scheduler.cancel("k")
+
+    assert run_scheduler(session, setup) == []
+    assert session.query(DbScheduledJob).one().status == "cancelled"
+
+
+def test_recurring_job_is_rescheduled(session):
+    def setup(scheduler):
+        scheduler.schedule("test", utcnow(), interval=datetime.timedelta(days=7), key="weekly")
+
+    assert run_scheduler(session, setup) == [{}]
+    job = session.query(DbScheduledJob).one()
+    assert job.status == "pending"
+    assert job.run_at > utcnow() + datetime.timedelta(days=6)
@@ -0,0 +1,45 @@
+"""Tests for util.templates."""
+
+import pytest
+
+pytest.importorskip("discord")
+
+from util.templates import diff_template
+
+
+def make_snapshot(roles=None, categories=None, channels=None):
+    return {"roles": roles or {}, "categories": categories or {}, "channels": channels or {}}
+
+
+RA = {"permissions": 8, "colour": 0xE74C3C, "hoist": True}
+
+
+def test_missing_role_is_created_with_permissions():
+    operations = diff_template(make_snapshot(roles={"RA": RA}), make_snapshot())
+
+    assert operations == [("create_role", "RA", RA)]
+
+
+def test_existing_role_keeps_its_permissions():
+    current = dict(RA, permissions=1024)
+
+    assert diff_template(make_snapshot(roles={"RA": RA}), make_snapshot(roles={"RA": current})) == []
+
+
+def test_existing_role_appearance_is_synced_without_permissions():
+    current = dict(RA, permissions=1024, hoist=False)
+
+    operations = diff_template(make_snapshot(roles={"RA": RA}), make_snapshot(roles={"RA": current}))
+
+    assert operations == [("edit_role", "RA", {"colour": 0xE74C3C, "hoist": True})]
+
+
+def test_extra_channels_in_target_are_left_alone():
+    channel = {"type": "text", "topic": None}
+    template = make_snapshot(categories={"info": {}}, channels={("info", "welcome"): channel})
+    current = make_snapshot(
+        categories={"info": {}, "floor 3": {}},
+        channels={("info", "welcome"): channel, ("floor 3", "chat"): channel},
+    )
+
+    assert diff_template(template, current) == []
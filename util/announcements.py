@@ -0,0 +1,62 @@
+"""Building the weekly announcement of upcoming events in each residence hall server.
+"""
+
+import datetime
+import discord
+
+# Opening line of every weekly announcement, also used to recognise old ones
+WEEKLY_ANNOUNCEMENT_HEADER = "Check out what's happening this week!"
+# Events starting within this long of the announcement are included
+ANNOUNCEMENT_WINDOW = datetime.timedelta(days=7)
+
+
+def events_this_week(
+    events: list[discord.ScheduledEvent],
+    now: datetime.datetime = None,
+    window: datetime.timedelta = ANNOUNCEMENT_WINDOW,
+):
+    """Pick out the scheduled events that start before the end of the announcement window.
+
+    Events that were due to start already but haven't been started are still included.
+
+    Args:
+        events (list[discord.ScheduledEvent]): A server's scheduled events.
+        now (datetime.datetime, optional): Timezone-aware time of the announcement. Defaults to now.
+        window (datetime.timedelta, optional): How far ahead to look.
+
+    Returns:
+        list[discord.ScheduledEvent]: The matching events, soonest first.
+    """
+    end = (now or discord.utils.utcnow()) + window
+    upcoming = [
+        event for event in events if event.status.name == "scheduled" and event.start_time < end
+    ]
+    return sorted(upcoming, key=lambda event: event.start_time)
+
+
+def build_weekly_announcement(
+    events: list[discord.ScheduledEvent],
+    residents_role: discord.Role = None,
+    now: datetime.datetime = None,
+):
+    """Build the weekly announcement for a server.
+
+    Args:
+        events (list[discord.ScheduledEvent]): The server's scheduled events.
+        residents_role (discord.Role, optional): Role to ping, if the server has one.
+        now (datetime.datetime, optional): Timezone-aware time of the announcement. Defaults to now.
+
+    Returns:
+        str: The announcement, or None if no events start this week.
+    """
+    upcoming = events_this_week(events, now)
+    if not upcoming:
+        return None
+
+    # Each event is a hidden link so Discord shows its embed without cluttering the message
+    links = "".join(f"[-]({event.url}) " for event in upcoming)
+    mention = f"{residents_role.mention} " if residents_role else ""
+    return (
+        f"{WEEKLY_ANNOUNCEMENT_HEADER} Make sure to click the \"interested\" button if you would like"
+        f" to be reminded when that event starts.\n||{mention}{links}||"
+    )
@@ -3,9 +3,9 @@
 
 # pylint: disable=too-few-public-methods
 
-from sqlalchemy import Column, BigInteger, String, Integer, Boolean, Date, DateTime, ForeignKey
+from sqlalchemy import Column, BigInteger, String, Text, Integer, Boolean, Date, DateTime, ForeignKey
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 from sqlalchemy.sql import func
 
 Base = declarative_base()
@@ -18,6 +18,7 @@ class DbUser(Base):
     `ID: BigInteger` = the user's discord ID
     `username: str`  = the user's discord username
     `email: str`     = the user's Pitt email address
+    `email_key: str` = the email address in lowercase, for case-insensitive lookups
     `verified: bool` = whether the user has verified their email address
     `is_ra: bool`    = whether the user is an RA or not
     `community: str` = the RA's community this user is a part of
@@ -31,6 +32,8 @@ class DbUser(Base):
     username = Column("username", String(50))
     # User's PITT email address
     email = Column("email", String(30))
+    # Lowercased copy of the email address, kept in sync by _normalize_email, so lookups can use an index
+    email_key = Column("email_key", String(30), index=True)
     # Whether the user has been verified or not
     verified = Column("verified", Boolean)
     # Is this user an RA?
@@ -42,6 +45,11 @@ class DbUser(Base):
     # When was this user last updated?
     updated_at = Column("updated_at", DateTime, default=func.now(), onupdate=func.now())
 
+    @validates("email")
+    def _normalize_email(self, key, email):
+        self.email_key = email.lower() if email else None
+        return email
+
     def __repr__(self):
         return f"User: {{\n\tid: {self.ID}\n\tusername: {self.username}\n\temail: {self.email}\n\tverified: {self.verified}}}"
 
@@ -184,4 +192,145 @@ class DbSubscriber(Base):
     event = relationship("DbEvent")
 
     def __repr__(self):
-        return f"Subscriber: {{\n\tsubscription_time: {self.subscription_time}\n\tuser_id: {self.user_id}\n\tevent_number: {self.event_number}\n}}"
\ No newline at end of file
+        return f"Subscriber: {{\n\tsubscription_time: {self.subscription_time}\n\tuser_id: {self.user_id}\n\tevent_number: {self.event_number}\n}}"
+
+class DbProvisionJob(Base):
+    """Represents a make_categories run in the bot's MySQL database, so that
+    a run which fails or is cancelled partway can be resumed.
+    ## Attributes
+
+    `ID: Integer`             = artificial primary key
+    `guild_id: BigInteger`    = guild the communities are being made in
+    `roster_hash: str`        = SHA-256 of the RA roster, used to match reruns to this job
+    `status: str`             = 'running', 'completed', 'failed' or 'cancelled'
+    `total: Integer`          = number of RAs in the roster
+    """
+
+    __tablename__ = "provisionjobs"
+
+    ID = Column("id", Integer, primary_key=True)
+    guild_id = Column("guildID", BigInteger)
+    roster_hash = Column("rosterHash", String(64))
+    status = Column("status", String(10))
+    total = Column("total", Integer)
+    created_at = Column("created_at", DateTime, default=func.now())
+    updated_at = Column("updated_at", DateTime, default=func.now(), onupdate=func.now())
+
+    items = relationship("DbProvisionItem", back_populates="job", order_by="DbProvisionItem.position")
+
+    def __repr__(self):
+        return f"ProvisionJob: {{\n\tid: {self.ID}\n\tguild_id: {self.guild_id}\n\tstatus: {self.status}\n\ttotal: {self.total}\n}}"
+
+
+class DbProvisionItem(Base):
+    """Represents the progress of a single RA within a provisioning job.
+    ## Attributes
+
+    `job_id: Integer`         = the job this RA belongs to
+    `position: Integer`       = line number of the RA in the roster
+    `ra_line: str`            = the RA's line from the roster
+    `category_id: BigInteger` = the RA's category, once created
+    `role_id: BigInteger`     = the RA's community role, once created
+    `invite_code: str`        = the RA's invite code, once created
+    `completed: bool`         = whether channels and permissions are also in place
+    """
+
+    __tablename__ = "provisionitems"
+
+    ID = Column("id", Integer, primary_key=True)
+    job_id = Column("jobID", Integer, ForeignKey("provisionjobs.id"))
+    position = Column("position", Integer)
+    ra_line = Column("raLine", String(100))
+    category_id = Column("categoryID", BigInteger)
+    role_id = Column("roleID", BigInteger)
+    invite_code = Column("invite", String(10))
+    completed = Column("completed", Boolean, default=False)
+
+    job = relationship("DbProvisionJob", back_populates="items")
+
+    def __repr__(self):
+        return f"ProvisionItem: {{\n\tjob_id: {self.job_id}\n\tposition: {self.position}\n\tcompleted: {self.completed}\n}}"
+
+
+class DbOutboxMessage(Base):
+    """Represents a direct message waiting to be (or already) sent by the DM outbox.
+    ## Attributes
+
+    `ID: Integer`           = artificial primary key
+    `user_id: BigInteger`   = the recipient's discord ID
+    `guild_id: BigInteger`  = the guild the message is about, for reporting failures
+    `dedup_key: str`        = messages with the same key to the same user within a window are dropped
+    `content: str`          = message text
+    `status: str`           = 'pending', 'sent' or 'failed'
+    `attempts: Integer`     = number of failed delivery attempts so far
+    """
+
+    __tablename__ = "outbox"
+
+    ID = Column("id", Integer, primary_key=True)
+    user_id = Column("user_id", BigInteger)
+    guild_id = Column("guildID", BigInteger)
+    dedup_key = Column("dedup_key", String(100))
+    content = Column("content", String(2000))
+    status = Column("status", String(10))
+    attempts = Column("attempts", Integer, default=0)
+    error = Column("error", String(200))
+    created_at = Column("created_at", DateTime)
+    sent_at = Column("sent_at", DateTime)
+
+    def __repr__(self):
+        return f"OutboxMessage: {{\n\tid: {self.ID}\n\tuser_id: {self.user_id}\n\tdedup_key: {self.dedup_key}\n\tstatus: {self.status}\n}}"
+
+
+class DbBotMessage(Base):
+    """Represents a message the bot posted and will later replace, so it can be found by ID.
+    ## Attributes
+
+    `ID: Integer`            = artificial primary key
+    `guild_id: BigInteger`   = the guild the message was posted in
+    `channel_id: BigInteger` = the channel the message was posted in
+    `message_id: BigInteger` = the message's discord ID
+    `kind: str`              = what the message is, e.g. 'verify', 'welcome' or 'weekly'
+    """
+
+    __tablename__ = "botmessages"
+
+    ID = Column("id", Integer, primary_key=True)
+    guild_id = Column("guildID", BigInteger, index=True)
+    channel_id = Column("channelID", BigInteger)
+    message_id = Column("messageID", BigInteger)
+    kind = Column("kind", String(20))
+    created_at = Column("created_at", DateTime, default=func.now())
+
+    def __repr__(self):
+        return f"BotMessage: {{\n\tguild: {self.guild_id}\n\tkind: {self.kind}\n\tmessage: {self.message_id}\n}}"
+
+
+class DbScheduledJob(Base):
+    """Represents a job waiting to be run by the scheduler.
+    ## Attributes
+
+    `ID: Integer`                = artificial primary key
+    `kind: str`                  = name of the handler that runs the job
+    `key: str`                   = optional unique name, so a job can be rescheduled or cancelled
+    `payload: str`               = JSON arguments for the handler
+    `run_at: DateTime`           = when the job next runs, in UTC
+    `interval_seconds: Integer`  = for recurring jobs, seconds between runs
+    `status: str`                = 'pending', 'done', 'failed' or 'cancelled'
+    """
+
+    __tablename__ = "scheduledjobs"
+
+    ID = Column("id", Integer, primary_key=True)
+    kind = Column("kind", String(50))
+    key = Column("key", String(100), index=True)
+    # Text, since broadcast messages alone can be up to 6000 characters before JSON escaping
+    payload = Column("payload", Text)
+    run_at = Column("run_at", DateTime)
+    interval_seconds = Column("interval_seconds", Integer)
+    status = Column("status", String(10), index=True)
+    error = Column("error", String(200))
+    created_at = Column("created_at", DateTime, default=func.now())
+
+    def __repr__(self):
+        return f"ScheduledJob: {{\n\tid: {self.ID}\n\tkind: {self.kind}\n\tkey: {self.key}\n\trun_at: {self.run_at}\n}}"
@@ -0,0 +1,35 @@
+"""Cloning hub scheduled events into the residence hall servers.
+"""
+
+import discord
+
+
+async def create_clone(
+    guild: discord.Guild,
+    hub_event: discord.ScheduledEvent,
+    location: str,
+    cover: bytes = None,
+):
+    """Create a copy of a hub event in a residence hall server.
+
+    Args:
+        guild (discord.Guild): The residence hall server.
+        hub_event (discord.ScheduledEvent): The event to copy.
+        location (str): Where the event takes place.
+        cover (bytes, optional): Cover image. The clone has no cover if this is None.
+
+    Returns:
+        discord.ScheduledEvent: The clone.
+    """
+    options = {}
+    # py-cord only leaves the image out when it is MISSING, and fails trying to encode None
+    if cover is not None:
+        options["image"] = cover
+    return await guild.create_scheduled_event(
+        name=hub_event.name,
+        description=hub_event.description,
+        location=location,
+        start_time=hub_event.start_time,
+        end_time=hub_event.end_time,
+        **options,
+    )
@@ -0,0 +1,127 @@
+"""Exporting database tables as gzipped CSV files.
+
+Rows are streamed from the database in batches over a server-side cursor
+and written straight into a compressed temporary file, so an export never
+holds the whole table in memory. Exports run in a worker thread with their
+own session, since the bot's session belongs to the event loop.
+"""
+
+import asyncio
+import csv
+import gzip
+import io
+import tempfile
+from .db import DbEvent, DbSubscriber, DbUser
+
+# Rows fetched from the database at a time
+EXPORT_BATCH_SIZE = 1000
+# Exports larger than this spill from memory to disk
+SPOOL_MAX_SIZE = 4 * 1024 * 1024
+
+
+def _write_csv_gz(query, header: list[str]):
+    """Write the rows of a query to a gzipped CSV file.
+
+    Args:
+        query (sqlalchemy.orm.Query): Query selecting the columns in `header`, in order.
+        header (list[str]): Column names for the first row.
+
+    Returns:
+        tuple: (file object positioned at the start, number of rows written)
+    """
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    count = 0
+    # Closing the wrappers finishes the gzip stream but leaves the spooled file open
+    compressed = gzip.GzipFile(fileobj=output, mode="wb")
+    with io.TextIOWrapper(compressed, encoding="utf-8", newline="") as text:
+        writer = csv.writer(text)
+        writer.writerow(header)
+        for row in query.execution_options(stream_results=True).yield_per(EXPORT_BATCH_SIZE):
+            writer.writerow(row)
+            count += 1
+    output.seek(0)
+    return (output, count)
+
+
+def export_users(session_factory):
+    """Export every user the bot has a record of.
+
+    Args:
+        session_factory (sqlalchemy.orm.sessionmaker): Makes the session used for the export.
+
+    Returns:
+        tuple: (gzipped CSV file object, number of rows)
+    """
+    session = session_factory()
+    try:
+        query = session.query(
+            DbUser.ID,
+            DbUser.username,
+            DbUser.email,
+            DbUser.verified,
+            DbUser.is_ra,
+            DbUser.community,
+            DbUser.joined_at,
+            DbUser.updated_at,
+        ).order_by(DbUser.ID)
+        return _write_csv_gz(
+            query,
+            ["id", "username", "email", "verified", "is_ra", "community", "joined_at", "updated_at"],
+        )
+    finally:
+        session.close()
+
+
+def export_subscribers(session_factory, event_number: int = None):
+    """Export event subscriptions along with the event each one is for.
+
+    Args:
+        session_factory (sqlalchemy.orm.sessionmaker): Makes the session used for the export.
+        event_number (int, optional): Only export subscribers of this event.
+
+    Returns:
+        tuple: (gzipped CSV file object, number of rows)
+    """
+    session = session_factory()
+    try:
+        query = session.query(
+            DbEvent.event_number,
+            DbEvent.event_name,
+            DbEvent.event_type,
+            DbEvent.start_time,
+            DbSubscriber.user_id,
+            DbSubscriber.user_name,
+            DbSubscriber.user_email,
+            DbSubscriber.subscription_time,
+        ).select_from(DbSubscriber).join(DbEvent, DbSubscriber.event_number == DbEvent.event_number)
+        if event_number is not None:
+            query = query.filter(DbSubscriber.event_number == event_number)
+        query = query.order_by(DbSubscriber.event_number, DbSubscriber.id)
+        return _write_csv_gz(
+            query,
+            [
+                "event_number",
+                "event_name",
+                "event_type",
+                "start_time",
+                "user_id",
+                "user_name",
+                "user_email",
+                "subscription_time",
+            ],
+        )
+    finally:
+        session.close()
+
+
+async def run_export(export, *args):
+    """Run one of the export functions in a worker thread so the event loop keeps running.
+
+    Args:
+        export (function): export_users or export_subscribers.
+        *args: Arguments for the export function.
+
+    Returns:
+        tuple: (gzipped CSV file object, number of rows)
+    """
+    return await asyncio.get_running_loop().run_in_executor(None, export, *args)
@@ -0,0 +1,115 @@
+"""Shared async HTTP client for pulling rosters, email lists and images
+from the web without blocking the event loop.
+"""
+
+import asyncio
+import aiohttp
+from .log import Log
+
+# Whole request, including reading the body, must finish within this many seconds
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=30, connect=10)
+# Maximum number of simultaneous connections held by the shared client
+MAX_CONNECTIONS = 20
+# Rosters and email lists are plain text, nothing legitimate is this large
+MAX_TEXT_BYTES = 2 * 1024 * 1024
+# Discord rejects uploads and event covers above this size anyway
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+
+# Created lazily, since aiohttp sessions must be made inside a running event loop
+_client = None
+
+
+class FetchError(Exception):
+    """Raised when a URL could not be fetched, returned a failure status, or was too large."""
+
+
+def get_client():
+    """Get the shared client session, creating it on first use.
+
+    Returns:
+        aiohttp.ClientSession: Pooled session shared by every fetch.
+    """
+    global _client
+    if _client is None or _client.closed:
+        _client = aiohttp.ClientSession(
+            timeout=REQUEST_TIMEOUT,
+            connector=aiohttp.TCPConnector(limit=MAX_CONNECTIONS, ttl_dns_cache=300),
+        )
+    return _client
+
+
+async def close():
+    """Close the shared client session, if one was created."""
+    global _client
+    if _client is not None and not _client.closed:
+        await _client.close()
+    _client = None
+
+
+async def fetch_lines(url: str, max_bytes: int = MAX_TEXT_BYTES):
+    """Stream a text document line by line.
+
+    Args:
+        url (str): URL of the document.
+        max_bytes (int, optional): Abort once the body grows past this many bytes.
+
+    Raises:
+        FetchError: If the request fails, returns a non-200 status, or is too large.
+
+    Yields:
+        str: Each line of the document, without its line ending.
+    """
+    read = 0
+    try:
+        async with get_client().get(url) as res:
+            if res.status != 200:
+                raise FetchError(
+                    f"Request did not return a success code, returned status: {res.status}"
+                )
+            if res.content_length and res.content_length > max_bytes:
+                raise FetchError(f"Document is {res.content_length} bytes, the limit is {max_bytes}")
+
+            async for raw_line in res.content:
+                read += len(raw_line)
+                if read > max_bytes:
+                    raise FetchError(f"Document is larger than the {max_bytes} byte limit")
+                yield raw_line.decode(res.charset or "utf-8", errors="replace").rstrip("\r\n")
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as ex:
+        Log.warning(f"Fetching {url} failed: {ex!r}")
+        raise FetchError(str(ex)) from ex
+
+
+async def fetch_bytes(url: str, max_bytes: int = MAX_IMAGE_BYTES):
+    """Download a whole file, such as an image, into memory.
+
+    Args:
+        url (str): URL of the file.
+        max_bytes (int, optional): Abort once the body grows past this many bytes.
+
+    Raises:
+        FetchError: If the request fails, returns a non-200 status, or is too large.
+
+    Returns:
+        bytes: The body of the response.
+    """
+    chunks = []
+    read = 0
+    try:
+        async with get_client().get(url) as res:
+            if res.status != 200:
+                raise FetchError(
+                    f"Request did not return a success code, returned status: {res.status}"
+                )
+            if res.content_length and res.content_length > max_bytes:
+                raise FetchError(f"File is {res.content_length} bytes, the limit is {max_bytes}")
+
+            async for chunk in res.content.iter_chunked(64 * 1024):
+                read += len(chunk)
+                if read > max_bytes:
+                    raise FetchError(f"File is larger than the {max_bytes} byte limit")
+                chunks.append(chunk)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as ex:
+        Log.warning(f"Fetching {url} failed: {ex!r}")
+        raise FetchError(str(ex)) from ex
+
+    return b"".join(chunks)
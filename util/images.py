@@ -0,0 +1,161 @@
+"""Downloading, validating and resizing images for event covers and broadcasts.
+
+Images are downloaded each time they are used, since what a URL points to
+can change, but resized copies are cached on disk under the SHA-256 of the
+original's contents. An image is therefore resized once no matter how many
+servers it is sent to or how many times an event is republished, and a
+changed image is never mistaken for the old one. Resizing is CPU-bound and
+runs in a process pool to keep the event loop responsive.
+
+Resizing needs Pillow. Without it images are still validated, but are
+passed through at their original size.
+"""
+
+import asyncio
+import hashlib
+import io
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from .fetch import MAX_IMAGE_BYTES, fetch_bytes
+from .log import Log
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+# Discord displays scheduled event covers at this size
+COVER_SIZE = (800, 320)
+# Where downloaded and resized images are kept
+CACHE_DIR = os.getenv("PITTBOT_IMAGE_CACHE") or os.path.join(tempfile.gettempdir(), "pittbot-images")
+# Worker processes used for resizing
+RESIZE_WORKERS = 2
+
+# Leading bytes of each image format Discord accepts, and the extension used for it
+IMAGE_SIGNATURES = {
+    b"\x89PNG\r\n\x1a\n": "png",
+    b"\xff\xd8\xff": "jpg",
+    b"GIF87a": "gif",
+    b"GIF89a": "gif",
+}
+
+# Created lazily, since most runs never resize anything
+_pool = None
+
+
+class ImageError(Exception):
+    """Raised when an image could not be downloaded or is not a usable image. The message is safe to show to users."""
+
+
+def detect_format(data: bytes):
+    """Work out an image's format from its leading bytes.
+
+    Args:
+        data (bytes): The image.
+
+    Returns:
+        str: File extension for the format, or None if it isn't a supported image.
+    """
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    for signature, extension in IMAGE_SIGNATURES.items():
+        if data.startswith(signature):
+            return extension
+    return None
+
+
+def _resize(data: bytes, size: tuple[int, int]):
+    # Runs in a worker process
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.fit(image.convert("RGB"), size, Image.LANCZOS)
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=90, optimize=True)
+        return output.getvalue()
+
+
+def _cache_path(key: str, size: tuple[int, int]):
+    return os.path.join(CACHE_DIR, f"{key}-{size[0]}x{size[1]}.jpg")
+
+
+def _read_cache(path: str):
+    try:
+        with open(path, "rb") as cached:
+            return cached.read()
+    except OSError:
+        return None
+
+
+def _write_cache(path: str, data: bytes):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        # Write then rename, so a half-written file is never read back
+        partial = f"{path}.{os.getpid()}.tmp"
+        with open(partial, "wb") as cached:
+            cached.write(data)
+        os.replace(partial, path)
+    except OSError as ex:
+        Log.warning(f"Couldn't cache image at {path}: {ex}")
+
+
+async def _in_thread(function, *args):
+    return await asyncio.get_running_loop().run_in_executor(None, function, *args)
+
+
+async def load_image(url: str, size: tuple[int, int] = None):
+    """Download an image from a URL, reusing a cached resize of the same image where possible.
+
+    Args:
+        url (str): Direct link to the image.
+        size (tuple[int, int], optional): Crop and scale the image to exactly this size.
+
+    Raises:
+        ImageError: If the image couldn't be downloaded or isn't a PNG, JPEG, GIF or WebP image.
+
+    Returns:
+        tuple: (image bytes, file extension)
+    """
+    try:
+        data = await fetch_bytes(url, MAX_IMAGE_BYTES)
+    except Exception as ex:
+        raise ImageError("The image couldn't be downloaded. Only direct image links are supported.") from ex
+
+    extension = detect_format(data)
+    if not extension:
+        raise ImageError("The link isn't to a PNG, JPEG, GIF or WebP image.")
+
+    if not size or Image is None:
+        return (data, extension)
+
+    # Keyed by content, so a URL whose image was replaced gets a fresh resize
+    key = hashlib.sha256(data).hexdigest()
+    resized_path = _cache_path(key, size)
+    resized = await _in_thread(_read_cache, resized_path)
+    if resized is None:
+        global _pool
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=RESIZE_WORKERS)
+        try:
+            resized = await asyncio.get_running_loop().run_in_executor(_pool, _resize, data, size)
+        except Exception as ex:
+            raise ImageError("The image couldn't be read, it may be corrupt.") from ex
+        await _in_thread(_write_cache, resized_path, resized)
+        Log.info(f"Resized image {key[:12]} to {size[0]}x{size[1]}")
+
+    return (resized, "jpg")
+
+
+async def load_cover(url: str):
+    """Get an image from a URL sized for a scheduled event cover.
+
+    Args:
+        url (str): Direct link to the image.
+
+    Raises:
+        ImageError: If the image couldn't be downloaded or isn't a usable image.
+
+    Returns:
+        bytes: The cover image.
+    """
+    data, _ = await load_image(url, COVER_SIZE)
+    return data
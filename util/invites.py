@@ -2,9 +2,11 @@
 based off of lists of RAs and what not.
 """
 import asyncio
+import csv
+import io
+import time
 import discord
 from discord import Colour, Permissions
-import requests
 from .log import Log
 
 # This file should have NO STATE. All functions are
@@ -29,138 +31,306 @@ def get_invite_from_code(invites, code):
     return None
 
 
-def read_from_haste(link: str):
-    """Read a list of RAs from a RAW hastebin link containing a return-delimited list of RAs for a server.
-    It is VERY important this link is the RAW link, or parsing will FAIL.
+# Maximum number of RAs provisioned at once. Each RA costs a handful of REST calls;
+# pycord already waits out 429s per rate limit bucket, this just keeps us from
+# flooding those buckets and tripping the global limit.
+PROVISION_CONCURRENCY = 5
+
+
+def parse_ra_first_name(ra_line: str):
+    """Pull the first name out of a roster line in either 'last, first' or 'last first' format.
 
     Args:
-        link (str): Link to raw hastebin with return-separated RA list..
+        ra_line (str): One line of the RA roster.
 
     Returns:
-        list[str]: List of RAs.
+        str: The RA's first name, or the whole (cleaned) line if it only holds one name.
     """
-    # Request the hastebin text.
-    res = requests.get(link)
+    # In case it is comma separated
+    if "," in ra_line:
+        try:
+            # Split on comma and parse first/last out
+            names = ra_line.split(",")
+            return names[1].rstrip().replace("\n", "").replace("\r", "")
+        except IndexError:
+            # If there is no second item in the split (there was only one name)
+            # then use the whole line (minus ',') as the name
+            return ra_line.strip().replace(",", "").replace("\n", "").replace("\r", "")
+    try:
+        names = ra_line.split(" ")
+        return names[1].rstrip().replace("\n", "").replace("\r", "")
+    except IndexError:
+        return ra_line.strip().replace("\n", "").replace("\r", "")
 
-    # On success return an array split on returns
-    if res.status_code == 200:
-        return res.text.split("\n")
 
-    # Otherwise the request returned an error code. This should probably be try-excepted in the main file.
-    raise requests.RequestException(
-        f"Request did not return a success code, returned status: {res.status_code}"
-    )
+def shared_category_overwrites(category: discord.CategoryChannel, roles: list[discord.Role]):
+    """Compute the overwrites for a shared category once each role has been let in.
+
+    The result is what calling `category.set_permissions(role, read_messages=True, view_channel=True)`
+    for every role would leave behind, so it can be applied with a single `category.edit(overwrites=...)`.
+
+    Args:
+        category (discord.CategoryChannel): The shared category, e.g. 'building' or 'info'.
+        roles (list[discord.Role]): Community roles that should be able to see it.
+
+    Returns:
+        dict: The category's existing overwrites plus one for each role.
+    """
+    overwrites = dict(category.overwrites)
+    for role in roles:
+        overwrites[role] = discord.PermissionOverwrite(read_messages=True, view_channel=True)
+    return overwrites
+
+
+async def provision_ra(
+    guild: discord.Guild,
+    position: int,
+    ra_line: str,
+    landing_channel: discord.TextChannel,
+    limiter: asyncio.Semaphore,
+    checkpoint=None,
+    on_progress=None,
+    cancel_event: asyncio.Event = None,
+):
+    """Create the category, channels, invite and role for a single RA.
+
+    Independent REST calls are issued together, so an RA costs two round trips
+    rather than six. Access to the shared 'building' and 'info' categories is granted
+    for every RA at once by `make_categories`. Anything recorded in `checkpoint` by an earlier, interrupted
+    run is reused rather than created again.
+
+    Args:
+        guild (discord.Guild): The guild in which to create the community.
+        position (int): Line number of the RA in the roster.
+        ra_line (str): The RA's line from the roster.
+        landing_channel (discord.TextChannel): Channel the invite points to.
+        limiter (asyncio.Semaphore): Bounds how many RAs are provisioned at once.
+        checkpoint (DbProvisionItem, optional): Progress saved for this RA by an earlier run.
+        on_progress (callable, optional): Called as `on_progress(position, invite_code, role_id, category_id, completed)`
+            once the category, invite and role have been created (None for any that failed), and again once
+            the RA is finished.
+        cancel_event (asyncio.Event, optional): When set, RAs that have not started yet are skipped.
+
+    Returns:
+        tuple: ((RA, community name, invite URL), invite code, role, category, seconds taken), or None if the RA was skipped.
+    """
+    first_name = parse_ra_first_name(ra_line)
+    community_name = f"RA {first_name.title()}'s Community"
+    ra_line = ra_line.replace("\n", "").replace("\r", "") #fix line break appearing in the report
+
+    # Reuse whatever an earlier run already made
+    category = None
+    new_role = None
+    invite_code = None
+    if checkpoint:
+        if checkpoint.category_id:
+            category = guild.get_channel(checkpoint.category_id)
+        if checkpoint.role_id:
+            new_role = guild.get_role(checkpoint.role_id)
+        invite_code = checkpoint.invite_code
+
+        if checkpoint.completed and category and new_role and invite_code:
+            return ((ra_line, community_name, f"https://discord.gg/{invite_code}"), invite_code, new_role, category, 0.0)
+
+    async with limiter:
+        if cancel_event and cancel_event.is_set():
+            return None
+
+        started = time.perf_counter()
+
+        # Create the RA's category, their invite and their community role
+        to_create = {}
+        if not category:
+            to_create["category"] = guild.create_category(
+                community_name,
+                overwrites={
+                    guild.default_role: discord.PermissionOverwrite(read_messages=False)
+                },
+            )
+        if not invite_code:
+            to_create["invite"] = landing_channel.create_invite()
+        if not new_role:
+            to_create["role"] = guild.create_role(
+                name=community_name,
+                color=Colour.blue(),
+                permissions=Permissions(view_channel=True),
+            )
+
+        results = await asyncio.gather(*to_create.values(), return_exceptions=True)
+        created = {
+            name: result
+            for name, result in zip(to_create, results)
+            if not isinstance(result, BaseException)
+        }
+
+        category = created.get("category", category)
+        new_role = created.get("role", new_role)
+        if "invite" in created:
+            invite_code = created["invite"].code
+
+        # Checkpoint whatever was made, even if something else failed, so a rerun doesn't make it again
+        if on_progress:
+            on_progress(
+                position,
+                invite_code,
+                new_role.id if new_role else None,
+                category.id if category else None,
+                False,
+            )
+
+        error = next((result for result in results if isinstance(result, BaseException)), None)
+        # Abnormal debugging issue
+        if isinstance(error, discord.errors.NotFound):
+            print(
+                f"No such channel exists, dumping channel object: {landing_channel=}"
+            )
+            return None
+        if error:
+            raise error
+
+        # Create the text and voice channels, and set permissions for our new
+        # category. Overwrites are idempotent, channels are not.
+        requests_to_make = [
+            category.set_permissions(new_role, read_messages=True, view_channel=True),
+        ]
+        if not discord.utils.get(category.text_channels, name="chat"):
+            requests_to_make.append(category.create_text_channel("chat"))
+        if not discord.utils.get(category.voice_channels, name="voice"):
+            requests_to_make.append(category.create_voice_channel("voice"))
+        await asyncio.gather(*requests_to_make)
+
+        elapsed = time.perf_counter() - started
+
+    if on_progress:
+        on_progress(position, invite_code, new_role.id, category.id, True)
+
+    Log.ok(f"Provisioned '{community_name}' in {guild.name}[{guild.id}] in {elapsed:.2f}s")
+
+    return ((ra_line, community_name, f"https://discord.gg/{invite_code}"), invite_code, new_role, category, elapsed)
 
 
 async def make_categories(
-    guild: discord.Guild, ras: list[str], landing_channel: discord.TextChannel
+    guild: discord.Guild,
+    ras: list[str],
+    landing_channel: discord.TextChannel,
+    checkpoints: dict = None,
+    on_progress=None,
+    cancel_event: asyncio.Event = None,
 ):
     """Make categories for each RA in an RA list, consisting of a text channel and voice channel.
 
+    RAs are provisioned concurrently (at most PROVISION_CONCURRENCY at a time), but the
+    RA to link file keeps the order of the roster. A failure for one RA does not stop
+    the others; see `provision_ra` for how checkpoints allow a rerun to resume.
+
     Args:
         guild (discord.Guild): The guild in which to create the categories, namely the calling guild.
         ras (list[str]): List of RA names.
+        landing_channel (discord.TextChannel): Channel the invites point to.
+        checkpoints (dict[int, DbProvisionItem], optional): Saved progress, keyed by roster position.
+        on_progress (callable, optional): Progress callback, passed on to `provision_ra`.
+        cancel_event (asyncio.Event, optional): When set, RAs that have not started yet are skipped.
+
+    Returns:
+        tuple: (invite code to role, category ID to role ID, (RA, community name, invite URL) rows
+            in roster order), or None if there is no landing channel.
     """
-    # Lines to add to the text file that is uploaded
+    # Generating invites is impossible without somewhere for them to land
+    if not landing_channel:
+        return None
+
+    checkpoints = checkpoints or {}
+
+    # Rows of the RA to link report that is uploaded
     ras_with_links = []
     # Dictionary that will associate RA links with category channels
     invite_to_role = {}
     # Associate category ID to role ID as per https://github.com/tjhubz/PittBOT/issues/19
     category_to_role = {}
 
-    # Iterate over all of the RAs in the hastebin response
-    for ra_line in ras:
-        # Will split out the first and last names of the RA
-        first_name = ""
-        # In case it is comma separated
-        if "," in ra_line:
-            try:
-                # Split on comma and parse first/last out
-                names = ra_line.split(",")
-                first_name = names[1].rstrip().replace("\n", "").replace("\r", "")
-            except IndexError:
-                # If there is no second item in the split (there was only one name)
-                # then use the whole line (minus ',') as the name
-                first_name = ra_line.strip().replace(",", "").replace("\n", "").replace("\r", "")
-        else:
-            try:
-                names = ra_line.split(" ")
-                first_name = names[1].rstrip().replace("\n", "").replace("\r", "")
-            except IndexError:
-                first_name = ra_line.strip().replace("\n", "").replace("\r", "")
-
-        # Create the RA's category
-        category = await guild.create_category(
-            f"RA {first_name.title()}'s Community",
-            overwrites={
-                guild.default_role: discord.PermissionOverwrite(read_messages=False)
-            },
+    building_category = discord.utils.get(
+        landing_channel.guild.categories, name="building"
+    )
+    if not building_category:
+        Log.warning(
+            f"Guild {guild.name}[{guild.id}] does not have a category named 'building'"
         )
 
-        # Create the text and voice channels
-        await category.create_text_channel("chat")
-        await category.create_voice_channel("voice")
-
-        # Generate an invite.
-        if landing_channel:
-            try:
-                invite = await landing_channel.create_invite()
-            # Abnormal debugging issue
-            except discord.errors.NotFound:
-                print(
-                    "No such channel exists, dumping channel object: {landing_channel=}"
-                )
-        else:
-            return None
-
-        building_category = discord.utils.get(
-            landing_channel.guild.categories, name="building"
+    info_category = discord.utils.get(landing_channel.guild.categories, name="info")
+    if not info_category:
+        Log.warning(
+            f"Guild {guild.name}[{guild.id}] does not have a category named 'info'"
         )
 
-        info_category = discord.utils.get(landing_channel.guild.categories, name="info")
-
-        ra_line = ra_line.replace("\n", "").replace("\r", "") #fix line break appearing in text file
-        ras_with_links.append(f"{ra_line} : {invite.url}\n")
-
-        perms = Permissions(view_channel=True)
-
-        # Generate a role to associate with the community.
-        new_role = await guild.create_role(
-            name=f"RA {first_name.title()}'s Community",
-            color=Colour.blue(),
-            permissions=perms,
-        )
+    limiter = asyncio.Semaphore(PROVISION_CONCURRENCY)
+    started = time.perf_counter()
 
-        # Set permissions for our new category
-        await category.set_permissions(new_role, read_messages=True, view_channel=True)
-
-        # Set permissions for other categories
-        if building_category:
-            await building_category.set_permissions(
-                new_role, read_messages=True, view_channel=True
-            )
-        else:
-            Log.warning(
-                f"Guild {guild.name}[{guild.id}] does not have a category named 'building'"
+    # gather() returns results in the order of the roster, regardless of completion order
+    results = await asyncio.gather(
+        *(
+            provision_ra(
+                guild,
+                position,
+                ra_line,
+                landing_channel,
+                limiter,
+                checkpoint=checkpoints.get(position),
+                on_progress=on_progress,
+                cancel_event=cancel_event,
             )
+            for position, ra_line in enumerate(ras)
+        ),
+        return_exceptions=True,
+    )
 
-        if info_category:
-            await info_category.set_permissions(
-                new_role, read_messages=True, view_channel=True
-            )
-        else:
-            Log.warning(
-                f"Guild {guild.name}[{guild.id}] does not have a category named 'info'"
-            )
+    for ra_line, result in zip(ras, results):
+        if isinstance(result, Exception):
+            Log.error(f"Failed to provision '{ra_line.strip()}' in {guild.name}[{guild.id}]: {result}")
+            continue
+        if not result:
+            continue
+        row, invite_code, new_role, category, _ = result
+        ras_with_links.append(row)
 
         # Build associations
         # TODO: Should this associate to the entire object, or just to ID?
-        invite_to_role[invite.code] = new_role
+        invite_to_role[invite_code] = new_role
         # ID : ID association, rather than ID : object association
         category_to_role[category.id] = new_role.id
 
-    # Create the text file associating the RAs to links that we will upload.
-    with open("ras-with-links.txt", "w") as ra_file:
-        ra_file.writelines(ras_with_links)
+    # Let every new community see the shared categories, with one edit per category
+    # rather than one per RA. Roles from earlier runs are included, which is harmless.
+    new_roles = list(invite_to_role.values())
+    for shared_category in (building_category, info_category):
+        if shared_category and new_roles:
+            await shared_category.edit(
+                overwrites=shared_category_overwrites(shared_category, new_roles)
+            )
+
+    Log.info(
+        f"Provisioned {len(category_to_role)} of {len(ras)} communities in {guild.name}[{guild.id}] in {time.perf_counter() - started:.2f}s"
+    )
+
+    return (invite_to_role, category_to_role, ras_with_links)
+
+
+def build_link_report(ras_with_links: list[tuple], as_csv: bool = False, name: str = "ras-with-links"):
+    """Build the file associating RAs to their invite links in memory, ready to upload.
+
+    Args:
+        ras_with_links (list[tuple]): (RA, community name, invite URL) rows, as returned by make_categories.
+        as_csv (bool, optional): Build a CSV with a header row instead of 'RA : link' lines.
+        name (str, optional): File name, without the extension.
+
+    Returns:
+        discord.File: The report, named e.g. ras-with-links.txt or ras-with-links.csv.
+    """
+    if as_csv:
+        text = io.StringIO()
+        writer = csv.writer(text)
+        writer.writerow(["ra", "community", "invite"])
+        writer.writerows(ras_with_links)
+        return discord.File(io.BytesIO(text.getvalue().encode()), filename=f"{name}.csv")
 
-    return (invite_to_role, category_to_role)
+    lines = "".join(f"{ra_line} : {url}\n" for ra_line, _, url in ras_with_links)
+    return discord.File(io.BytesIO(lines.encode()), filename=f"{name}.txt")
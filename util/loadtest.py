@@ -0,0 +1,321 @@
+"""Load test harness for the verification flow.
+
+Drives VerifyView -> verify() -> VerifyModal.callback with synthetic
+interactions against a stubbed Discord HTTP layer and a real database,
+then reports throughput, latency percentiles and how many responses
+missed Discord's 3 second interaction window.
+
+Run from the repository root (the bot reads config.json from the cwd):
+
+    python -m util.loadtest --users 500 --concurrency 50
+
+By default a throwaway SQLite database is used. Set PITTBOT_DATABASE_URL
+(or the usual MYSQL_* variables with --use-mysql) to test against MySQL.
+"""
+
+import argparse
+import asyncio
+import importlib
+import math
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+
+from .log import Log
+
+# Discord closes the interaction if it has not been responded to in this many seconds.
+INTERACTION_WINDOW = 3.0
+
+
+class StubHTTP:
+    """Stand-in for Discord's REST API. Every call sleeps for a simulated round trip.
+
+    Args:
+        latency (float): Mean simulated round trip in seconds.
+        jitter (float): Standard deviation of the simulated round trip.
+    """
+
+    def __init__(self, latency: float, jitter: float):
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = Counter()
+
+    async def request(self, route: str):
+        self.calls[route] += 1
+        await asyncio.sleep(max(0.0, random.gauss(self.latency, self.jitter)))
+
+
+class FakeRole:
+    def __init__(self, role_id: int, name: str):
+        self.id = role_id
+        self.name = name
+        self.mention = f"<@&{role_id}>"
+
+    def __str__(self):
+        return self.name
+
+
+class FakeInvite:
+    def __init__(self, code: str, uses: int):
+        self.code = code
+        self.uses = uses
+        self.url = f"https://discord.gg/{code}"
+
+
+class FakeChannel:
+    def __init__(self, http: StubHTTP, channel_id: int, name: str):
+        self.http = http
+        self.id = channel_id
+        self.name = name
+
+    async def send(self, *args, **kwargs):
+        await self.http.request("POST /channels/{id}/messages")
+
+    async def set_permissions(self, *args, **kwargs):
+        await self.http.request("PUT /channels/{id}/permissions/{target}")
+
+
+class FakeMember:
+    def __init__(self, http: StubHTTP, member_id: int, name: str, roles: list):
+        self.http = http
+        self.id = member_id
+        self.name = name
+        self.display_name = name
+        self.mention = f"<@{member_id}>"
+        self.roles = roles
+
+    def __str__(self):
+        return self.name
+
+    async def edit(self, **kwargs):
+        await self.http.request("PATCH /guilds/{id}/members/{id}")
+
+    async def add_roles(self, *roles, reason=None):
+        for role in roles:
+            await self.http.request("PUT /guilds/{id}/members/{id}/roles/{id}")
+            self.roles.append(role)
+
+
+class FakeGuild:
+    def __init__(self, http: StubHTTP, guild_id: int, name: str):
+        self.http = http
+        self.id = guild_id
+        self.name = name
+        self.members = []
+        self.channels = []
+        self.roles = []
+        self.invite_list = []
+
+    async def invites(self):
+        await self.http.request("GET /guilds/{id}/invites")
+        return list(self.invite_list)
+
+
+class FakeResponse:
+    """Mimics InteractionResponse, timestamping the first response to the interaction."""
+
+    def __init__(self, interaction):
+        self.interaction = interaction
+
+    async def _respond(self, route: str):
+        if self.interaction.responded_at is None:
+            self.interaction.responded_at = time.perf_counter()
+        await self.interaction.harness.http.request(route)
+
+    async def send_message(self, *args, **kwargs):
+        await self._respond("POST /interactions/{id}/{token}/callback")
+
+    async def defer(self, *args, **kwargs):
+        await self._respond("POST /interactions/{id}/{token}/callback")
+
+    async def send_modal(self, modal):
+        await self._respond("POST /interactions/{id}/{token}/callback")
+        # The user fills the modal in and submits it as a brand new interaction.
+        asyncio.create_task(self.interaction.harness.submit_modal(modal, self.interaction.user))
+
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self.interaction = interaction
+
+    async def send(self, *args, **kwargs):
+        await self.interaction.harness.http.request("POST /webhooks/{id}/{token}")
+
+
+class FakeInteraction:
+    def __init__(self, harness, user: FakeMember, guild: FakeGuild):
+        self.harness = harness
+        self.user = user
+        self.guild = guild
+        self.created_at = time.perf_counter()
+        self.responded_at = None
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+        harness.interactions.append(self)
+
+
+class VerifyLoadTest:
+    """Runs synthetic verifications concurrently against the bot module.
+
+    Args:
+        bot_module (module): The imported `bot` module.
+        http (StubHTTP): Stubbed Discord REST layer.
+        users (int): Number of synthetic members to verify.
+        concurrency (int): Maximum number of verifications in flight at once.
+        think_time (float): Seconds a synthetic user spends filling in the modal.
+    """
+
+    def __init__(self, bot_module, http: StubHTTP, users: int, concurrency: int, think_time: float):
+        self.bot = bot_module
+        self.http = http
+        self.users = users
+        self.concurrency = concurrency
+        self.think_time = think_time
+        self.interactions = []
+        self.completed = 0
+        self.errors = 0
+        self.guild = None
+
+    def build_guild(self, id_base: int):
+        """Create a fake guild with the channels, roles and invites verification relies on,
+        and seed the bot's caches and database as on_ready/on_member_join would.
+        """
+        bot = self.bot
+        guild = FakeGuild(self.http, id_base, "Load Test Hall")
+        landing = FakeChannel(self.http, id_base + 1, "verify")
+        guild.channels = [landing, FakeChannel(self.http, id_base + 2, "logs")]
+        community_role = FakeRole(id_base + 3, "RA Test's Community")
+        guild.roles = [FakeRole(id_base + 4, "RA"), FakeRole(id_base + 5, "residents"), community_role]
+        invite = FakeInvite("loadtest", uses=1)
+        guild.invite_list = [invite]
+
+        bot.invites_cache[guild.id] = list(guild.invite_list)
+        bot.invite_to_role[invite.code] = community_role
+        bot.guild_to_landing[guild.id] = landing
+        bot.get_guild_ready(guild.id).set()
+
+        for i in range(self.users):
+            member = FakeMember(self.http, id_base + 1000 + i, f"loadtest{i}", [])
+            guild.members.append(member)
+            bot.user_to_invite[member.id] = invite
+            bot.session.merge(bot.DbVerifyingUser(ID=member.id, invite_code=invite.code))
+        bot.session.commit()
+
+        self.guild = guild
+
+    async def submit_modal(self, modal, user: FakeMember):
+        await asyncio.sleep(self.think_time)
+        modal.children[0].value = f"{user.name}@pitt.edu"
+        modal.children[1].value = ""
+        try:
+            await modal.callback(FakeInteraction(self, user, self.guild))
+        except Exception as ex:
+            self.errors += 1
+            Log.error(f"Modal submission for {user.name} raised: {ex!r}")
+        finally:
+            modal.stop()
+
+    async def run_one(self, member: FakeMember, limiter: asyncio.Semaphore):
+        async with limiter:
+            view = self.bot.VerifyView()
+            button = next(item for item in view.children if getattr(item, "label", None) == "Verify")
+            try:
+                await button.callback(FakeInteraction(self, member, self.guild))
+                self.completed += 1
+            except Exception as ex:
+                self.errors += 1
+                Log.error(f"Verification for {member.name} raised: {ex!r}")
+
+    async def run(self):
+        limiter = asyncio.Semaphore(self.concurrency)
+        start = time.perf_counter()
+        await asyncio.gather(*(self.run_one(member, limiter) for member in self.guild.members))
+        return time.perf_counter() - start
+
+
+def percentile(values: list[float], pct: float):
+    """Nearest-rank percentile of a list of values.
+
+    Args:
+        values (list[float]): Samples, in any order.
+        pct (float): Percentile in the range [0, 100].
+
+    Returns:
+        float: The percentile, or 0.0 if there are no samples.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def report(test: VerifyLoadTest, elapsed: float):
+    """Log and return a summary of a finished load test run."""
+    latencies = [
+        inter.responded_at - inter.created_at
+        for inter in test.interactions
+        if inter.responded_at is not None
+    ]
+    unanswered = sum(1 for inter in test.interactions if inter.responded_at is None)
+    summary = {
+        "verifications": test.completed,
+        "errors": test.errors,
+        "elapsed": elapsed,
+        "throughput": test.completed / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies, default=0.0),
+        "over_window": sum(1 for latency in latencies if latency > INTERACTION_WINDOW) + unanswered,
+        "rest_calls": sum(test.http.calls.values()),
+    }
+
+    Log.info(f"Verified {summary['verifications']} users in {elapsed:.2f}s ({summary['throughput']:.1f}/s), {summary['errors']} errors")
+    Log.info(f"Response latency p50={summary['p50'] * 1000:.0f}ms p99={summary['p99'] * 1000:.0f}ms max={summary['max'] * 1000:.0f}ms")
+    Log.info(f"Stub REST calls: {summary['rest_calls']}")
+    for route, count in test.http.calls.most_common():
+        Log.info(f"    {count:>6}  {route}")
+    if summary["over_window"]:
+        Log.error(f"{summary['over_window']} responses exceeded the {INTERACTION_WINDOW:.0f}s interaction window")
+    else:
+        Log.ok(f"All responses were within the {INTERACTION_WINDOW:.0f}s interaction window")
+
+    return summary
+
+
+def load_bot(use_mysql: bool):
+    """Import bot.py without logging in, pointing it at a scratch database unless told otherwise."""
+    for var in ("HUB_SERVER_ID", "BOT_COMMANDS_ID", "ERRORS_CHANNEL_ID"):
+        os.environ.setdefault(var, "0")
+    if not use_mysql and not os.getenv("PITTBOT_DATABASE_URL"):
+        scratch = os.path.join(tempfile.mkdtemp(prefix="pittbot-loadtest-"), "loadtest.db")
+        os.environ["PITTBOT_DATABASE_URL"] = f"sqlite:///{scratch}"
+    return importlib.import_module("bot")
+
+
+async def main(args):
+    bot_module = load_bot(args.use_mysql)
+    test = VerifyLoadTest(
+        bot_module,
+        StubHTTP(args.latency, args.jitter),
+        users=args.users,
+        concurrency=args.concurrency,
+        think_time=args.think_time,
+    )
+    test.build_guild(args.id_base)
+    Log.info(f"Starting verification load test: {args.users} users, concurrency {args.concurrency}")
+    return report(test, await test.run())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the verification flow.")
+    parser.add_argument("--users", type=int, default=200, help="number of synthetic members to verify")
+    parser.add_argument("--concurrency", type=int, default=25, help="verifications in flight at once")
+    parser.add_argument("--latency", type=float, default=0.08, help="mean simulated REST round trip (s)")
+    parser.add_argument("--jitter", type=float, default=0.03, help="std. deviation of REST round trip (s)")
+    parser.add_argument("--think-time", type=float, default=0.0, help="time users spend filling in the modal (s)")
+    parser.add_argument("--id-base", type=int, default=9_000_000_000, help="first snowflake used for fake objects")
+    parser.add_argument("--use-mysql", action="store_true", help="use the MYSQL_* database instead of scratch SQLite")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,188 @@
+"""Outbox for direct messages to members.
+
+Messages are written to the database before they are sent, delivered by a
+small pool of workers, retried on transient errors, and deduplicated per
+user so a resident doesn't get the same reminder twice. Pending messages
+are picked back up when the bot restarts.
+"""
+
+import asyncio
+import datetime
+import aiohttp
+import discord
+from .db import DbOutboxMessage
+from .log import Log
+
+# Number of DMs being delivered at once
+DM_CONCURRENCY = 5
+# Messages with the same dedup key to the same user are dropped within this window
+DEFAULT_DEDUP_WINDOW = datetime.timedelta(days=1)
+# Give up on a message after this many transient failures
+MAX_ATTEMPTS = 4
+# Seconds before the first retry; doubles with each attempt
+RETRY_BASE_DELAY = 5.0
+
+
+class DmOutbox:
+    """Persistent, rate limited queue of direct messages.
+
+    Args:
+        bot (discord.Bot): The bot to send messages as.
+        session (sqlalchemy.orm.Session): Database session used to persist the queue.
+        concurrency (int, optional): Number of delivery workers.
+        on_failure (coroutine function, optional): Awaited as `on_failure(message, exception)`
+            when a message is given up on.
+    """
+
+    def __init__(self, bot: discord.Bot, session, concurrency: int = DM_CONCURRENCY, on_failure=None):
+        self.bot = bot
+        self.session = session
+        self.concurrency = concurrency
+        self.on_failure = on_failure
+        self.queue = asyncio.Queue()
+        self.workers = []
+        # Message ID to the future handed back by enqueue, for messages queued since startup
+        self.waiters = {}
+
+    async def start(self):
+        """Start the delivery workers and requeue anything left pending by a previous run.
+        Safe to call more than once (on_ready can fire repeatedly)."""
+        if self.workers:
+            return
+
+        pending = (
+            self.session.query(DbOutboxMessage)
+            .filter_by(status="pending")
+            .order_by(DbOutboxMessage.ID)
+            .all()
+        )
+        for message in pending:
+            self.queue.put_nowait(message.ID)
+        if pending:
+            Log.info(f"Requeued {len(pending)} pending direct messages")
+
+        self.workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    def enqueue(
+        self,
+        user_id: int,
+        content: str,
+        dedup_key: str = None,
+        dedup_window: datetime.timedelta = DEFAULT_DEDUP_WINDOW,
+        guild_id: int = None,
+    ):
+        """Queue a direct message.
+
+        Args:
+            user_id (int): Recipient's discord ID.
+            content (str): Message text.
+            dedup_key (str, optional): Drop this message if one with the same key was queued
+                for the same user within `dedup_window`.
+            dedup_window (datetime.timedelta, optional): See `dedup_key`.
+            guild_id (int, optional): Guild the message is about, passed along to `on_failure`.
+
+        Returns:
+            asyncio.Future: Resolves to 'sent', 'failed' or 'duplicate'.
+        """
+        future = asyncio.get_running_loop().create_future()
+        now = datetime.datetime.now()
+
+        if dedup_key:
+            duplicate = (
+                self.session.query(DbOutboxMessage)
+                .filter(
+                    DbOutboxMessage.user_id == user_id,
+                    DbOutboxMessage.dedup_key == dedup_key,
+                    DbOutboxMessage.status != "failed",
+                    DbOutboxMessage.created_at >= now - dedup_window,
+                )
+                .first()
+            )
+            if duplicate:
+                Log.info(f"Dropped duplicate '{dedup_key}' message to user {user_id}")
+                future.set_result("duplicate")
+                return future
+
+        message = DbOutboxMessage(
+            user_id=user_id,
+            guild_id=guild_id,
+            dedup_key=dedup_key,
+            content=content[:2000],
+            status="pending",
+            attempts=0,
+            created_at=now,
+        )
+        self.session.add(message)
+        try:
+            self.session.commit()
+        except Exception as ex:
+            self.session.rollback()
+            Log.error(f"Couldn't persist a direct message to user {user_id}: {ex}")
+            future.set_result("failed")
+            return future
+
+        self.waiters[message.ID] = future
+        self.queue.put_nowait(message.ID)
+        return future
+
+    async def _worker(self):
+        while True:
+            message_id = await self.queue.get()
+            try:
+                await self._deliver(message_id)
+            except Exception as ex:
+                Log.error(f"DM outbox worker failed on message {message_id}: {ex}")
+            finally:
+                self.queue.task_done()
+
+    async def _deliver(self, message_id: int):
+        message = self.session.get(DbOutboxMessage, message_id)
+        if not message or message.status != "pending":
+            return
+
+        try:
+            user = self.bot.get_user(message.user_id) or await self.bot.fetch_user(message.user_id)
+            await user.send(message.content)
+        except (discord.Forbidden, discord.NotFound) as ex:
+            # The user doesn't allow DMs or no longer exists; retrying won't help
+            await self._finish(message, "failed", ex)
+        except (discord.HTTPException, aiohttp.ClientError, asyncio.TimeoutError) as ex:
+            transient = not isinstance(ex, discord.HTTPException) or ex.status >= 500 or ex.status == 429
+            message.attempts += 1
+            if not transient or message.attempts >= MAX_ATTEMPTS:
+                await self._finish(message, "failed", ex)
+                return
+
+            message.error = str(ex)[:200]
+            self._commit()
+            delay = RETRY_BASE_DELAY * 2 ** (message.attempts - 1)
+            Log.warning(f"DM to user {message.user_id} failed ({ex}), retrying in {delay:.0f}s")
+            asyncio.get_running_loop().call_later(delay, self.queue.put_nowait, message.ID)
+        else:
+            await self._finish(message, "sent")
+
+    async def _finish(self, message: DbOutboxMessage, status: str, ex: Exception = None):
+        message.status = status
+        if status == "sent":
+            message.sent_at = datetime.datetime.now()
+        else:
+            message.error = str(ex)[:200]
+            Log.warning(f"Giving up on DM {message.ID} to user {message.user_id}: {ex}")
+        self._commit()
+
+        future = self.waiters.pop(message.ID, None)
+        if future and not future.done():
+            future.set_result(status)
+
+        if status == "failed" and self.on_failure:
+            try:
+                await self.on_failure(message, ex)
+            except Exception as callback_ex:
+                Log.error(f"DM outbox failure callback raised: {callback_ex}")
+
+    def _commit(self):
+        try:
+            self.session.commit()
+        except Exception as ex:
+            self.session.rollback()
+            Log.error(f"Couldn't save DM outbox state: {ex}")
@@ -0,0 +1,139 @@
+"""Deleting large numbers of messages from a channel.
+
+Discord only bulk deletes messages younger than 14 days, at most 100 per
+request. Anything older has to be deleted one message at a time, which is
+far more heavily rate limited, so those deletes are fed through a bounded
+queue to a small pool of workers while history keeps being paged through.
+Paging pauses whenever the queue is full, so memory stays bounded no matter
+how much old history a channel has.
+"""
+
+import asyncio
+import datetime
+import discord
+from .log import Log
+
+# Most messages a single bulk delete accepts
+BULK_DELETE_LIMIT = 100
+# Discord refuses to bulk delete messages older than this; the margin covers clock drift
+BULK_DELETE_MAX_AGE = datetime.timedelta(days=14) - datetime.timedelta(minutes=5)
+# Single message deletes in flight at once
+SINGLE_DELETE_CONCURRENCY = 3
+# Old messages waiting for a single delete before paging through history pauses
+SINGLE_DELETE_BACKLOG = 100
+
+
+def parse_bound(value: str):
+    """Parse a purge bound given as a message ID, message link or YYYY-MM-DD date.
+
+    Args:
+        value (str): What the user typed.
+
+    Raises:
+        ValueError: If the value is none of the above.
+
+    Returns:
+        discord.Object | datetime.datetime: Something channel.history accepts as before/after.
+    """
+    value = value.strip().rstrip("/").split("/")[-1]
+    if value.isdigit():
+        return discord.Object(id=int(value))
+    date = datetime.datetime.strptime(value, "%Y-%m-%d")
+    return date.replace(tzinfo=datetime.timezone.utc)
+
+
+async def purge_channel(
+    channel: discord.TextChannel,
+    author: discord.abc.User = None,
+    before=None,
+    after=None,
+    limit: int = None,
+    progress: dict = None,
+):
+    """Delete every message in a channel that matches the filters.
+
+    Args:
+        channel (discord.TextChannel): Channel to purge.
+        author (discord.abc.User, optional): Only delete this user's messages.
+        before (discord.Object | datetime.datetime, optional): Only delete messages before this.
+        after (discord.Object | datetime.datetime, optional): Only delete messages after this.
+        limit (int, optional): Delete at most this many messages. Defaults to no limit.
+        progress (dict, optional): Kept up to date with 'scanned', 'deleted' and 'failed' counts,
+            for showing progress while the purge runs.
+
+    Returns:
+        dict: The final 'scanned', 'deleted' and 'failed' counts.
+    """
+    progress = progress if progress is not None else {}
+    progress.update(scanned=0, deleted=0, failed=0)
+    limiter = asyncio.Semaphore(SINGLE_DELETE_CONCURRENCY)
+    old_messages = asyncio.Queue(maxsize=SINGLE_DELETE_BACKLOG)
+    batch = []
+    matched = 0
+
+    async def delete_one(message: discord.Message):
+        async with limiter:
+            try:
+                await message.delete()
+            except discord.NotFound:
+                # Already gone, which is what we wanted
+                pass
+            except discord.HTTPException as ex:
+                progress["failed"] += 1
+                Log.warning(f"Couldn't delete message {message.id} in #{channel.name}: {ex}")
+                return
+            progress["deleted"] += 1
+
+    async def flush():
+        messages = batch.copy()
+        batch.clear()
+        if len(messages) == 1:
+            await delete_one(messages[0])
+            return
+        try:
+            await channel.delete_messages(messages)
+            progress["deleted"] += len(messages)
+        except discord.HTTPException as ex:
+            # One bad message fails the whole batch, so fall back to deleting them individually
+            Log.warning(f"Bulk delete in #{channel.name} failed ({ex}), deleting individually")
+            await asyncio.gather(*(delete_one(message) for message in messages))
+
+    async def delete_old():
+        while (message := await old_messages.get()) is not None:
+            await delete_one(message)
+
+    workers = [asyncio.create_task(delete_old()) for _ in range(SINGLE_DELETE_CONCURRENCY)]
+    try:
+        cutoff = discord.utils.utcnow() - BULK_DELETE_MAX_AGE
+        async for message in channel.history(limit=None, before=before, after=after):
+            progress["scanned"] += 1
+            if author and message.author.id != author.id:
+                continue
+
+            matched += 1
+            if message.created_at > cutoff:
+                batch.append(message)
+                if len(batch) == BULK_DELETE_LIMIT:
+                    await flush()
+            else:
+                # Waits while the queue is full, so old messages never pile up in memory
+                await old_messages.put(message)
+
+            if limit and matched >= limit:
+                break
+
+        if batch:
+            await flush()
+        # One stop signal per worker, queued behind the remaining messages
+        for _ in workers:
+            await old_messages.put(None)
+        await asyncio.gather(*workers)
+    finally:
+        for worker in workers:
+            worker.cancel()
+
+    Log.ok(
+        f"Purged {progress['deleted']} messages from #{channel.name} in {channel.guild.name}[{channel.guild.id}]"
+        f" ({progress['failed']} failed, {progress['scanned']} scanned)"
+    )
+    return progress
@@ -0,0 +1,145 @@
+"""Reading and validating the line-based lists admins hand the bot,
+namely RA rosters for make_categories and email lists for assign.
+
+Lists can come from a raw paste link or an uploaded .txt/.csv attachment,
+and are streamed line by line rather than downloaded and split whole.
+"""
+
+import re
+import discord
+from .fetch import MAX_TEXT_BYTES, fetch_lines
+from .invites import parse_ra_first_name
+
+# Uploaded lists must be plain text
+SUPPORTED_EXTENSIONS = (".txt", ".csv")
+# Matches the width of the columns these lines end up in
+MAX_LINE_LENGTH = 100
+# Starts a guild's section in a multi-guild roster, e.g. "[Towers]"
+SECTION_HEADER = re.compile(r"^\[(.+)\]$")
+
+
+class RosterError(Exception):
+    """Raised when a list was given in a form the bot can't read. The message is safe to show to users."""
+
+
+async def read_lines(link: str = None, attachment: discord.Attachment = None):
+    """Stream the lines of a list from either an attachment or a raw paste link.
+    The attachment is preferred if both are given.
+
+    Args:
+        link (str, optional): Raw hastebin/pastebin link.
+        attachment (discord.Attachment, optional): Uploaded .txt or .csv file.
+
+    Raises:
+        RosterError: If neither source was given, or the given one is unsuitable.
+        FetchError: If the list could not be downloaded.
+
+    Yields:
+        str: Each line of the list, without its line ending.
+    """
+    if attachment:
+        if not attachment.filename.lower().endswith(SUPPORTED_EXTENSIONS):
+            raise RosterError("Uh oh! The attached file needs to be a `.txt` or `.csv` file.")
+        if attachment.size > MAX_TEXT_BYTES:
+            raise RosterError(f"Uh oh! The attached file is too large, the limit is {MAX_TEXT_BYTES // 1024} KB.")
+        source = attachment.url
+    elif link:
+        # It is SIGNIFICANT that the link is to a RAW paste, or it will not be parsed correctly.
+        if "raw" not in link:
+            raise RosterError(
+                "Uh oh! You need to send a `raw` link. Click the 'Just Text' button on hastebin to get one."
+            )
+        source = link
+    else:
+        raise RosterError("Please attach a `.txt` or `.csv` file, or give a raw hastebin/pastebin link.")
+
+    async for line in fetch_lines(source):
+        yield line
+
+
+def _clean(line: str):
+    # Drop byte order marks that editors like to prepend, and CSV quoting
+    return line.replace("\ufeff", "").replace('"', "").strip()
+
+
+def clean_ra_line(line: str):
+    """Clean and validate a roster line in 'last, first' or 'last first' format.
+
+    Args:
+        line (str): Line from the roster.
+
+    Raises:
+        ValueError: If the line can't be a name.
+
+    Returns:
+        str: The cleaned line, or None if the line is blank and should be skipped.
+    """
+    line = _clean(line)
+    if not line or not line.strip(","):
+        return None
+    if len(line) > MAX_LINE_LENGTH:
+        raise ValueError(f"longer than {MAX_LINE_LENGTH} characters")
+    if not any(char.isalpha() for char in parse_ra_first_name(line)):
+        raise ValueError(f"'{line}' doesn't look like a name")
+    return line
+
+
+def clean_email_line(line: str):
+    """Clean and validate an email list line. CSV lines use their first column.
+
+    Args:
+        line (str): Line from the email list.
+
+    Raises:
+        ValueError: If the line isn't an email address.
+
+    Returns:
+        str: The lowercased email address, or None if the line is blank and should be skipped.
+    """
+    email = _clean(line.split(",")[0]).lower()
+    if not email:
+        return None
+    if len(email) > MAX_LINE_LENGTH or email.count("@") != 1 or " " in email:
+        raise ValueError(f"'{email[:MAX_LINE_LENGTH]}' isn't an email address")
+    return email
+
+
+async def read_guild_rosters(attachment: discord.Attachment):
+    """Read a multi-guild roster, where each guild's RAs follow a `[guild name or ID]` header line.
+
+    Args:
+        attachment (discord.Attachment): Uploaded .txt or .csv file.
+
+    Raises:
+        RosterError: If the attachment is unsuitable.
+        FetchError: If the attachment could not be downloaded.
+
+    Returns:
+        tuple: (dict of header text to cleaned RA lines, in file order; list of unreadable lines)
+    """
+    rosters = {}
+    invalid_lines = []
+    section = None
+    line_number = 0
+
+    async for line in read_lines(attachment=attachment):
+        line_number += 1
+        header = SECTION_HEADER.match(_clean(line))
+        if header:
+            section = header.group(1).strip()
+            rosters.setdefault(section, [])
+            continue
+
+        try:
+            ra_line = clean_ra_line(line)
+        except ValueError as ex:
+            invalid_lines.append(f"Line {line_number}: {ex}")
+            continue
+        if not ra_line:
+            continue
+        if section is None:
+            invalid_lines.append(f"Line {line_number}: comes before any [guild] header")
+            continue
+        rosters[section].append(ra_line)
+
+    return (rosters, invalid_lines)
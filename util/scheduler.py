@@ -0,0 +1,190 @@
+"""In-process scheduler for one-shot and recurring jobs.
+
+Jobs are stored in the database and kept in a heap ordered by when they next
+run. A single task sleeps until the earliest job is due, or until an earlier
+job is scheduled, so nothing polls. Pending jobs are reloaded on startup,
+and any that came due while the bot was down run straight away.
+"""
+
+import asyncio
+import datetime
+import heapq
+import traceback
+import orjson
+from .db import DbScheduledJob
+from .log import Log
+
+
+def to_utc(when: datetime.datetime):
+    """Convert a datetime to the naive UTC form jobs are stored in. Naive input is assumed to be UTC.
+    Microseconds are dropped, since MySQL DATETIME columns don't keep them."""
+    if when.tzinfo is not None:
+        when = when.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return when.replace(microsecond=0)
+
+
+def utcnow():
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+class Scheduler:
+    """Persistent job scheduler.
+
+    Args:
+        session (sqlalchemy.orm.Session): Database session used to persist jobs.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        # Job kind to the coroutine function that runs it, called with the job's payload
+        self.handlers = {}
+        # (run_at, job ID) for every pending job; entries for rescheduled jobs go stale and are skipped
+        self.heap = []
+        self.wake = asyncio.Event()
+        self.runner = None
+
+    def register(self, kind: str, handler):
+        """Register the coroutine function that runs jobs of a kind.
+
+        Args:
+            kind (str): Name of the job kind.
+            handler (coroutine function): Awaited as `handler(payload)` when a job is due.
+        """
+        self.handlers[kind] = handler
+
+    def start(self):
+        """Load pending jobs from the database and start running them. Safe to call more than once."""
+        if self.runner and not self.runner.done():
+            return
+
+        self.heap = [
+            (job.run_at, job.ID)
+            for job in self.session.query(DbScheduledJob).filter_by(status="pending")
+        ]
+        heapq.heapify(self.heap)
+        if self.heap:
+            Log.info(f"Loaded {len(self.heap)} scheduled jobs")
+        self.runner = asyncio.create_task(self._run())
+
+    def schedule(
+        self,
+        kind: str,
+        run_at: datetime.datetime,
+        payload: dict = None,
+        interval: datetime.timedelta = None,
+        key: str = None,
+    ):
+        """Schedule a job, replacing the pending job with the same key if there is one.
+
+        Args:
+            kind (str): Kind of job, see `register`.
+            run_at (datetime.datetime): When the job runs (next).
+            payload (dict, optional): JSON serializable arguments for the handler.
+            interval (datetime.timedelta, optional): Makes the job recurring, running this often.
+            key (str, optional): Unique name for the job.
+
+        Returns:
+            DbScheduledJob: The job.
+        """
+        job = None
+        if key:
+            job = self.session.query(DbScheduledJob).filter_by(key=key, status="pending").first()
+        if not job:
+            job = DbScheduledJob(kind=kind, key=key, status="pending")
+            self.session.add(job)
+        previous_run_at = job.run_at
+
+        job.kind = kind
+        job.payload = orjson.dumps(payload or {}).decode()
+        job.run_at = to_utc(run_at)
+        job.interval_seconds = int(interval.total_seconds()) if interval else None
+        if not self._commit():
+            return None
+
+        # A pending job already has an entry for its time; a second one would run it twice
+        if job.run_at != previous_run_at:
+            self._push(job)
+        return job
+
+    def cancel(self, key: str):
+        """Cancel the pending job with a key, if there is one.
+
+        Returns:
+            bool: Whether a job was cancelled.
+        """
+        job = self.session.query(DbScheduledJob).filter_by(key=key, status="pending").first()
+        if not job:
+            return False
+        job.status = "cancelled"
+        # Its heap entry is skipped once it comes up
+        return self._commit()
+
+    def get(self, key: str):
+        """Get the pending job with a key, or None."""
+        return self.session.query(DbScheduledJob).filter_by(key=key, status="pending").first()
+
+    def _push(self, job: DbScheduledJob):
+        heapq.heappush(self.heap, (job.run_at, job.ID))
+        # Let the runner recalculate how long to sleep, in case this job is now the earliest
+        self.wake.set()
+
+    async def _run(self):
+        while True:
+            self.wake.clear()
+            if not self.heap:
+                await self.wake.wait()
+                continue
+
+            run_at, job_id = self.heap[0]
+            delay = (run_at - utcnow()).total_seconds()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self.wake.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self.heap)
+            job = self.session.get(DbScheduledJob, job_id)
+            # Skip entries for jobs that were cancelled, finished or moved since they were pushed
+            if not job or job.status != "pending" or job.run_at != run_at:
+                continue
+            asyncio.create_task(self._execute(job))
+
+            # Recurring jobs are rescheduled straight away, skipping runs missed while the bot was down
+            if job.interval_seconds:
+                interval = datetime.timedelta(seconds=job.interval_seconds)
+                now = utcnow()
+                while job.run_at <= now:
+                    job.run_at += interval
+                if self._commit():
+                    self._push(job)
+
+    async def _execute(self, job: DbScheduledJob):
+        handler = self.handlers.get(job.kind)
+        payload = orjson.loads(job.payload or "{}")
+        error = None
+
+        if handler is None:
+            error = f"no handler registered for '{job.kind}'"
+        else:
+            try:
+                Log.info(f"Running scheduled job {job.ID} ({job.kind})")
+                await handler(payload)
+            except Exception as ex:
+                error = str(ex)
+                Log.error(f"Scheduled job {job.ID} ({job.kind}) failed: {ex}\n{traceback.format_exc()}")
+
+        job.error = error[:200] if error else None
+        if not job.interval_seconds:
+            job.status = "failed" if error else "done"
+        self._commit()
+
+    def _commit(self):
+        try:
+            self.session.commit()
+            return True
+        except Exception as ex:
+            self.session.rollback()
+            Log.error(f"Couldn't save scheduled job: {ex}")
+            return False
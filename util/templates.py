@@ -0,0 +1,203 @@
+"""Guild templates: snapshot the layout of one guild (the hub), work out what
+another guild is missing or has out of date, and apply only those changes.
+
+Only the channels, categories and roles every residence hall server shares
+are part of the template; the hub's own staff roles and channels are not.
+Snapshots are plain dictionaries built from the gateway cache, so taking one
+costs no REST calls, and applying a diff twice is a no-op.
+"""
+
+import asyncio
+import discord
+from .log import Log
+
+# Maximum number of template operations running at once in a single guild
+TEMPLATE_CONCURRENCY = 5
+
+# The parts of the hub that are copied to residence hall servers, by name
+TEMPLATE_ROLES = {"RA"}
+TEMPLATE_CATEGORIES = {"building", "info"}
+TEMPLATE_CHANNELS = {"verify", "welcome", "logs", "questions"}
+
+
+def snapshot_guild(guild: discord.Guild):
+    """Capture the parts of a guild's layout that the template engine manages.
+
+    Args:
+        guild (discord.Guild): The guild to snapshot.
+
+    Returns:
+        dict: {"roles": {name: spec}, "categories": {name: {}}, "channels": {(category name, name): spec}}
+    """
+    snapshot = {"roles": {}, "categories": {}, "channels": {}}
+
+    for role in guild.roles:
+        if role.managed or role.name not in TEMPLATE_ROLES:
+            continue
+        snapshot["roles"][role.name] = {
+            "permissions": role.permissions.value,
+            "colour": role.colour.value,
+            "hoist": role.hoist,
+        }
+
+    for category in guild.categories:
+        if category.name in TEMPLATE_CATEGORIES:
+            snapshot["categories"][category.name] = {}
+
+    for channel in guild.channels:
+        if isinstance(channel, discord.CategoryChannel) or channel.name not in TEMPLATE_CHANNELS:
+            continue
+        # Channels outside the template's categories are matched by name alone, wherever they are
+        category_name = channel.category.name if channel.category else None
+        if category_name not in TEMPLATE_CATEGORIES:
+            category_name = None
+
+        if isinstance(channel, discord.ForumChannel):
+            kind = "forum"
+        elif isinstance(channel, discord.VoiceChannel):
+            kind = "voice"
+        elif isinstance(channel, discord.TextChannel):
+            kind = "text"
+        else:
+            continue
+
+        spec = {"type": kind, "topic": getattr(channel, "topic", None) or None}
+        if kind == "forum":
+            spec["tags"] = sorted(
+                (tag.name, tag.emoji.name if tag.emoji else None) for tag in channel.available_tags
+            )
+        snapshot["channels"][(category_name, channel.name)] = spec
+
+    return snapshot
+
+
+def diff_template(template: dict, snapshot: dict):
+    """Compute the operations that bring a guild in line with a template.
+
+    Only additions and edits are produced; anything the guild has beyond the
+    template is left alone. Roles the guild already has keep their permissions,
+    since servers tune them; only their colour and hoisting are synced.
+
+    Args:
+        template (dict): Snapshot of the template guild.
+        snapshot (dict): Snapshot of the guild to update.
+
+    Returns:
+        list[tuple]: (operation, key, spec) tuples, where operation is one of 'create_role',
+            'edit_role', 'create_category', 'create_channel' or 'edit_channel'.
+    """
+    operations = []
+
+    for name, spec in template["roles"].items():
+        current = snapshot["roles"].get(name)
+        if current is None:
+            operations.append(("create_role", name, spec))
+            continue
+        appearance = {field: value for field, value in spec.items() if field != "permissions"}
+        if any(current[field] != value for field, value in appearance.items()):
+            operations.append(("edit_role", name, appearance))
+
+    for name in template["categories"]:
+        if name not in snapshot["categories"]:
+            operations.append(("create_category", name, {}))
+
+    for key, spec in template["channels"].items():
+        current = snapshot["channels"].get(key)
+        if current is None:
+            operations.append(("create_channel", key, spec))
+        elif current["type"] == spec["type"] and current != spec:
+            operations.append(("edit_channel", key, spec))
+
+    return operations
+
+
+def describe_operation(operation: tuple):
+    """Human readable form of an operation from diff_template."""
+    kind, key, spec = operation
+    if kind in ("create_channel", "edit_channel"):
+        category_name, name = key
+        where = f" in '{category_name}'" if category_name else ""
+        return f"{kind.replace('_', ' ')} {spec['type']} '{name}'{where}"
+    return f"{kind.replace('_', ' ')} '{key}'"
+
+
+def _forum_tags(spec: dict):
+    return [
+        discord.ForumTag(name=name, moderated=False, emoji=discord.PartialEmoji(name=emoji) if emoji else None)
+        for name, emoji in spec.get("tags", [])
+    ]
+
+
+async def _apply_operation(guild: discord.Guild, operation: tuple, categories: dict):
+    kind, key, spec = operation
+
+    if kind == "create_role":
+        await guild.create_role(
+            name=key,
+            permissions=discord.Permissions(spec["permissions"]),
+            colour=discord.Colour(spec["colour"]),
+            hoist=spec["hoist"],
+        )
+    elif kind == "edit_role":
+        role = discord.utils.get(guild.roles, name=key)
+        await role.edit(
+            colour=discord.Colour(spec["colour"]),
+            hoist=spec["hoist"],
+        )
+    elif kind == "create_category":
+        # Remembered here since the cache only learns of it once the gateway event arrives
+        categories[key] = await guild.create_category(key)
+    elif kind in ("create_channel", "edit_channel"):
+        category_name, name = key
+        category = categories.get(category_name) if category_name else None
+
+        if kind == "edit_channel":
+            channel = discord.utils.find(
+                lambda c: c.name == name and (c.category.name if c.category else None) == category_name,
+                guild.channels,
+            )
+            if spec["type"] == "forum":
+                await channel.edit(topic=spec["topic"], available_tags=_forum_tags(spec))
+            elif spec["type"] == "text":
+                await channel.edit(topic=spec["topic"])
+        elif spec["type"] == "text":
+            await guild.create_text_channel(name, category=category, topic=spec["topic"])
+        elif spec["type"] == "voice":
+            await guild.create_voice_channel(name, category=category)
+        elif spec["type"] == "forum":
+            forum_channel = await guild.create_forum_channel(name, category=category)
+            await forum_channel.edit(topic=spec["topic"], available_tags=_forum_tags(spec))
+
+
+async def apply_diff(guild: discord.Guild, operations: list[tuple]):
+    """Apply the operations from diff_template to a guild, concurrently where possible.
+
+    Roles and categories are made first, since channels may need to be placed in them.
+
+    Args:
+        guild (discord.Guild): The guild to update.
+        operations (list[tuple]): Operations from diff_template.
+
+    Returns:
+        list[tuple]: (operation, exception) for every operation that failed.
+    """
+    limiter = asyncio.Semaphore(TEMPLATE_CONCURRENCY)
+    categories = {category.name: category for category in guild.categories}
+    failures = []
+
+    async def run(operation):
+        async with limiter:
+            try:
+                await _apply_operation(guild, operation, categories)
+                Log.ok(f"Template: {describe_operation(operation)} in {guild.name}[{guild.id}]")
+            except Exception as ex:
+                Log.error(f"Template: couldn't {describe_operation(operation)} in {guild.name}[{guild.id}]: {ex}")
+                failures.append((operation, ex))
+
+    first = [op for op in operations if op[0] in ("create_role", "edit_role", "create_category")]
+    second = [op for op in operations if op not in first]
+
+    await asyncio.gather(*(run(op) for op in first))
+    await asyncio.gather(*(run(op) for op in second))
+
+    return failures